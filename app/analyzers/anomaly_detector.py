@@ -0,0 +1,329 @@
+import json
+import math
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timezone
+import pandas as pd
+from config.settings import Config
+from processors.ticker_sentiment import explode_ticker_scores
+
+
+class AlertSink(ABC):
+    @abstractmethod
+    def emit(self, alert):
+        """Deliver one alert"""
+        pass
+
+
+class FileAlertSink(AlertSink):
+    """Append alerts to a JSON-lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def emit(self, alert):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert, default=str) + '\n')
+
+
+class QueueAlertSink(AlertSink):
+    """Hand alerts to an in-process consumer"""
+
+    def __init__(self, alert_queue=None):
+        self.queue = alert_queue if alert_queue is not None else queue.Queue()
+
+    def emit(self, alert):
+        self.queue.put(alert)
+
+
+class _Ewma:
+    """Exponentially weighted mean and variance; a plain running mean during warm-up"""
+    __slots__ = ('mean', 'var', 'n')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+
+    def update(self, x, alpha):
+        alpha = max(alpha, 1.0 / (self.n + 1))
+        diff = x - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        self.var = (1 - alpha) * (self.var + diff * incr)
+        self.n += 1
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class _TickerState:
+    __slots__ = ('sentiment', 'volume', 'bucket', 'bucket_count', 'volume_alerted', 'cusum_pos', 'cusum_neg',
+                 'seen')
+    # Checkpoint columns after the ticker, in to_row order
+    COLUMNS = ('seen', 'sentiment_mean', 'sentiment_var', 'sentiment_n', 'volume_mean', 'volume_var', 'volume_n',
+               'bucket', 'bucket_count', 'volume_alerted', 'cusum_pos', 'cusum_neg')
+
+    def __init__(self):
+        self.sentiment = _Ewma()
+        self.volume = _Ewma()
+        self.bucket = None
+        self.bucket_count = 0
+        self.volume_alerted = False
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.seen = 0
+
+    def to_row(self):
+        return (self.seen, self.sentiment.mean, self.sentiment.var, self.sentiment.n,
+                self.volume.mean, self.volume.var, self.volume.n,
+                self.bucket, self.bucket_count, int(self.volume_alerted), self.cusum_pos, self.cusum_neg)
+
+    @classmethod
+    def from_row(cls, row):
+        state = cls()
+        (state.seen, state.sentiment.mean, state.sentiment.var, state.sentiment.n,
+         state.volume.mean, state.volume.var, state.volume.n,
+         state.bucket, state.bucket_count, volume_alerted, state.cusum_pos, state.cusum_neg) = row
+        state.volume_alerted = bool(volume_alerted)
+        return state
+
+
+class AnomalyDetector:
+    """Streaming volume and sentiment spike detection per ticker.
+
+    Every ticker keeps a fixed-size state: EWMA baselines of per-bucket article
+    volume and of compound sentiment, plus two-sided CUSUM accumulators. Articles
+    are checked as they arrive, so an alert is emitted as soon as the article
+    that triggers it has been scored. The least recently seen tickers are
+    evicted once ``max_tickers`` is reached. Given the storage's connection
+    pool, the state is checkpointed to SQLite after every batch and restored
+    on start, so baselines survive restarts. Each batch first adopts the state
+    other processes checkpointed for its tickers, so processes sharing the
+    database build on one baseline per ticker instead of overwriting each
+    other's.
+    """
+    SENTIMENT_STD_FLOOR = 0.05
+
+    def __init__(self, sinks=None, pool=None, table_name='anomaly_detector_state', **overrides):
+        config = dict(Config().ANOMALY_CONFIG, **overrides)
+        self.sinks = sinks if sinks is not None else [FileAlertSink(config['alerts_path'])]
+        self.bucket_seconds = config['bucket'].total_seconds()
+        self.alpha = config['alpha']
+        self.z_threshold = config['z_threshold']
+        self.cusum_drift = config['cusum_drift']
+        self.cusum_threshold = config['cusum_threshold']
+        self.warmup = config['warmup']
+        self.max_tickers = config['max_tickers']
+        # Empty buckets beyond this barely move the baseline any further
+        self.max_empty_buckets = int(math.ceil(5 / self.alpha))
+        self._tickers = OrderedDict()
+        self._clock = 0
+        self._dirty = set()
+        self._evicted = set()
+        self._lock = threading.RLock()
+        self.pool = pool
+        self.table_name = table_name
+        if pool is not None:
+            self._initialize_table()
+            self.load()
+
+    def _initialize_table(self):
+        """Create the checkpoint table if it doesn't exist"""
+        with self.pool.writer() as conn:
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                ticker TEXT PRIMARY KEY,
+                seen INTEGER NOT NULL,
+                sentiment_mean REAL NOT NULL,
+                sentiment_var REAL NOT NULL,
+                sentiment_n INTEGER NOT NULL,
+                volume_mean REAL NOT NULL,
+                volume_var REAL NOT NULL,
+                volume_n INTEGER NOT NULL,
+                bucket INTEGER,
+                bucket_count INTEGER NOT NULL,
+                volume_alerted INTEGER NOT NULL,
+                cusum_pos REAL NOT NULL,
+                cusum_neg REAL NOT NULL
+            )
+            """)
+
+    def load(self):
+        """Restore the checkpointed state of the most recently seen tickers"""
+        with self.pool.reader() as conn:
+            rows = conn.execute(f"""
+            SELECT ticker, {', '.join(_TickerState.COLUMNS)} FROM {self.table_name}
+            ORDER BY seen DESC LIMIT ?
+            """, (self.max_tickers,)).fetchall()
+        with self._lock:
+            self._tickers = OrderedDict((row[0], _TickerState.from_row(row[1:])) for row in reversed(rows))
+            self._clock = rows[0][1] if rows else 0
+            self._dirty.clear()
+            self._evicted.clear()
+
+    def refresh(self, conn, tickers):
+        """Adopt the checkpointed state of ``tickers`` without unsaved updates here.
+
+        Those tickers' state equals their last checkpoint unless another
+        process has checkpointed since, so this only picks up other
+        processes' articles.
+        """
+        with self._lock:
+            tickers = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self._dirty]
+            for start in range(0, len(tickers), 500):
+                chunk = tickers[start:start + 500]
+                rows = conn.execute(f"""
+                SELECT ticker, {', '.join(_TickerState.COLUMNS)} FROM {self.table_name}
+                WHERE ticker IN ({', '.join('?' * len(chunk))})
+                """, chunk).fetchall()
+                for row in rows:
+                    self._tickers[row[0]] = _TickerState.from_row(row[1:])
+                    self._evicted.discard(row[0])
+            self._evict()
+            clock = conn.execute(f"SELECT MAX(seen) FROM {self.table_name}").fetchone()[0]
+            self._clock = max(self._clock, clock or 0)
+
+    def checkpoint(self, conn=None):
+        """Persist the state of every ticker seen since the last checkpoint and forget evicted ones"""
+        if self.pool is None:
+            return
+        if conn is None:
+            with self._lock, self.pool.writer() as conn:
+                return self.checkpoint(conn)
+        with self._lock:
+            conn.executemany(f"""
+            INSERT OR REPLACE INTO {self.table_name} (ticker, {', '.join(_TickerState.COLUMNS)})
+            VALUES ({', '.join('?' * (len(_TickerState.COLUMNS) + 1))})
+            """, [(ticker,) + self._tickers[ticker].to_row() for ticker in self._dirty])
+            conn.executemany(f"DELETE FROM {self.table_name} WHERE ticker = ?",
+                             [(ticker,) for ticker in self._evicted])
+            self._dirty.clear()
+            self._evicted.clear()
+
+    def _state(self, ticker):
+        state = self._tickers.get(ticker)
+        if state is None:
+            state = self._tickers[ticker] = _TickerState()
+            self._evicted.discard(ticker)
+            self._evict()
+        else:
+            self._tickers.move_to_end(ticker)
+        self._clock += 1
+        state.seen = self._clock
+        self._dirty.add(ticker)
+        return state
+
+    def _evict(self):
+        """Forget the least recently seen tickers beyond ``max_tickers``"""
+        while len(self._tickers) > self.max_tickers:
+            evicted, _ = self._tickers.popitem(last=False)
+            self._dirty.discard(evicted)
+            self._evicted.add(evicted)
+
+    def observe(self, ticker, score, published, source=None, title=None):
+        """Check one scored article against the ticker's baselines and return any alerts"""
+        with self._lock:
+            return self._observe(ticker, score, published, source, title)
+
+    def _observe(self, ticker, score, published, source, title):
+        published = pd.Timestamp(published)
+        if published.tzinfo is None:
+            published = published.tz_localize('UTC')
+        state = self._state(ticker)
+        context = {'ticker': ticker, 'published': published.isoformat(), 'source': source, 'title': title}
+        alerts = []
+
+        # Volume: roll the bucket forward, then test the bucket in progress
+        bucket = int(published.timestamp() // self.bucket_seconds)
+        if state.bucket is None:
+            state.bucket = bucket
+        elif bucket > state.bucket:
+            self._close_buckets(state, bucket)
+        state.bucket_count += 1
+
+        volume = state.volume
+        if volume.n >= self.warmup and not state.volume_alerted:
+            std = max(volume.std, math.sqrt(volume.mean), 1.0)
+            z = (state.bucket_count - volume.mean) / std
+            if z >= self.z_threshold:
+                state.volume_alerted = True
+                alerts.append(self._alert('volume_spike', 'up', state.bucket_count, volume.mean, z, context))
+
+        # Sentiment: z-score of the article and CUSUM of the drift
+        sentiment = state.sentiment
+        if sentiment.n >= self.warmup:
+            z = (score - sentiment.mean) / max(sentiment.std, self.SENTIMENT_STD_FLOOR)
+            if abs(z) >= self.z_threshold:
+                direction = 'up' if z > 0 else 'down'
+                alerts.append(self._alert('sentiment_zscore', direction, score, sentiment.mean, z, context))
+
+            state.cusum_pos = max(0.0, state.cusum_pos + z - self.cusum_drift)
+            state.cusum_neg = max(0.0, state.cusum_neg - z - self.cusum_drift)
+            if state.cusum_pos >= self.cusum_threshold or state.cusum_neg >= self.cusum_threshold:
+                up = state.cusum_pos >= self.cusum_threshold
+                statistic = state.cusum_pos if up else state.cusum_neg
+                alerts.append(self._alert('sentiment_cusum', 'up' if up else 'down', score, sentiment.mean,
+                                          statistic, context))
+                state.cusum_pos = state.cusum_neg = 0.0
+        sentiment.update(score, self.alpha)
+
+        for alert in alerts:
+            self._emit(alert)
+        return alerts
+
+    def observe_batch(self, df, score_col='compound', ticker_sentiment=None):
+        """Feed newly scored articles in publication order, checkpoint, and return the alerts raised"""
+        if df.empty or score_col not in df.columns:
+            return []
+
+        scores = explode_ticker_scores(df, ticker_sentiment, score_col=score_col)
+        scores['published'] = pd.to_datetime(scores['published'], utc=True, errors='coerce')
+        scores = scores.dropna(subset=['published', 'score']).sort_values('published', kind='stable')
+
+        alerts = []
+        with self._lock, (self.pool.writer() if self.pool is not None else nullcontext()) as conn:
+            if conn is not None:
+                # The database's write lock is held from the refresh to the checkpoint,
+                # so no other process can checkpoint in between and be overwritten
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                self.refresh(conn, scores['ticker'])
+            for ticker, score, published, source, title in zip(
+                    scores['ticker'], scores['score'], scores['published'], scores['source'], scores['title']):
+                alerts.extend(self._observe(ticker, float(score), published, source, title))
+            self.checkpoint(conn)
+        return alerts
+
+    def _close_buckets(self, state, bucket):
+        """Fold the finished bucket, and any empty ones since, into the volume baseline"""
+        state.volume.update(state.bucket_count, self.alpha)
+        for _ in range(min(bucket - state.bucket - 1, self.max_empty_buckets)):
+            state.volume.update(0, self.alpha)
+        state.bucket = bucket
+        state.bucket_count = 0
+        state.volume_alerted = False
+
+    def _alert(self, kind, direction, value, baseline, statistic, context):
+        return dict(
+            context,
+            kind=kind,
+            direction=direction,
+            value=value,
+            baseline=baseline,
+            statistic=statistic,
+            detected_at=datetime.now(timezone.utc).isoformat()
+        )
+
+    def _emit(self, alert):
+        for sink in self.sinks:
+            try:
+                sink.emit(alert)
+            except Exception as e:
+                print(f"Error emitting alert to {sink.__class__.__name__}: {str(e)}")
@@ -1,58 +1,121 @@
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from textblob import TextBlob
 import pandas as pd
 from config.settings import API_KEYS, DATABASE_CONFIG , Config
 
-class SentimentAnalyzer:
+class Document:
+    """Text as given and whitespace-normalized once, shared by all scorers"""
+    __slots__ = ('raw', 'text')
+
+    def __init__(self, text):
+        self.raw = text
+        self.text = ' '.join(text.split())
+
+
+class VaderScorer:
+    columns = ['vader_compound', 'vader_pos', 'vader_neg']
+
+    def __init__(self):
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def score(self, doc):
+        # VADER relies on casing and punctuation, so it reads the normalized text
+        scores = self.analyzer.polarity_scores(doc.text)
+        return {
+            'vader_compound': scores['compound'],
+            'vader_pos': scores['pos'],
+            'vader_neg': scores['neg']
+        }
+
+
+class TextBlobScorer:
+    columns = ['textblob_polarity', 'textblob_subjectivity']
+
     def __init__(self):
-        self.vader = SentimentIntensityAnalyzer()
+        # Imported here so VADER-only deployments never load TextBlob/pattern
+        from textblob.en import sentiment
+        self.sentiment = sentiment
+
+    def score(self, doc):
+        # Pattern's lexicon tokenizes the raw text itself, the same as TextBlob(text).sentiment;
+        # its own tokens keep contractions and emoticons that a word list would split
+        polarity, subjectivity = self.sentiment(doc.raw)
+        return {
+            'textblob_polarity': polarity,
+            'textblob_subjectivity': subjectivity
+        }
+
+
+class ScoringPipeline:
+    """Run the enabled sentiment models over one normalized copy of the text"""
+    SCORERS = {
+        'vader': VaderScorer,
+        'textblob': TextBlobScorer
+    }
+
+    def __init__(self, models):
+        unknown = [m for m in models if m not in self.SCORERS]
+        if unknown or not models:
+            raise ValueError(f"Unsupported sentiment models: {unknown or models}")
+        self.models = list(dict.fromkeys(models))
+        self.scorers = [self.SCORERS[m]() for m in self.models]
+        self.columns = [c for scorer in self.scorers for c in scorer.columns]
+
+    def empty_scores(self):
+        return dict.fromkeys(self.columns, 0)
+
+    def score(self, text):
+        doc = Document(text)
+        if not doc.text:
+            return self.empty_scores()
+
+        scores = {}
+        for scorer in self.scorers:
+            scores.update(scorer.score(doc))
+        return scores
+
+
+class SentimentAnalyzer:
+    def __init__(self, models=None):
         self.config = Config()
-        
+        self.pipeline = ScoringPipeline(models or self.config.SENTIMENT_MODELS)
+
     def analyze_text(self, text):
         if not text or not isinstance(text, str):
-            return {
-                'vader_compound': 0,
-                'vader_pos': 0,
-                'vader_neg': 0,
-                'textblob_polarity': 0,
-                'textblob_subjectivity': 0,
-                'sentiment_label': 'neutral'
-            }
-            
-        vader_scores = self.vader.polarity_scores(text)
-        blob = TextBlob(text)
-        
-        return {
-            'vader_compound': vader_scores['compound'],
-            'vader_pos': vader_scores['pos'],
-            'vader_neg': vader_scores['neg'],
-            'textblob_polarity': blob.sentiment.polarity,
-            'textblob_subjectivity': blob.sentiment.subjectivity,
-            'sentiment_label': self._classify_sentiment(vader_scores['compound'])
-        }
-    
+            scores = self.pipeline.empty_scores()
+        else:
+            scores = self.pipeline.score(text)
+
+        scores['sentiment_label'] = self._classify_sentiment(self._primary_score(scores))
+        return scores
+
+    def _primary_score(self, scores):
+        if 'vader_compound' in scores:
+            return scores['vader_compound']
+        return scores['textblob_polarity']
+
     def _classify_sentiment(self, score):
-        if score >= self.config.SENTIMENT_THRESHOLDS['positive']:
+        # Strict cut-offs, the same as the stored labels, rollups and article filters
+        if score > self.config.SENTIMENT_THRESHOLDS['positive']:
             return 'positive'
-        elif score <= self.config.SENTIMENT_THRESHOLDS['negative']:
+        elif score < self.config.SENTIMENT_THRESHOLDS['negative']:
             return 'negative'
         return 'neutral'
-    
+
     def analyze_dataframe(self, df):
         if df.empty:
             return pd.DataFrame()
-            
+
         df = df.copy()
-        
+
         # Ensure required columns exist
         if 'content' not in df.columns:
             df['content'] = ''
-            
+
         # Apply sentiment analysis
         df['sentiment'] = df['content'].apply(self.analyze_text)
-        
+
         # Expand sentiment columns
         sentiment_cols = pd.json_normalize(df['sentiment'])
         result_df = pd.concat([df.drop('sentiment', axis=1), sentiment_cols], axis=1)
-        
-        return result_df
\ No newline at end of file
+
+        return result_df
@@ -0,0 +1,226 @@
+import threading
+import time
+import pandas as pd
+from config.settings import Config
+from processors.ticker_sentiment import explode_ticker_scores
+
+
+class SentimentIndex:
+    """Exponentially time-decayed sentiment per ticker, updated in O(1) per article.
+
+    Each ticker keeps a decayed weighted sum of scores and a decayed sum of
+    weights, both expressed at the time of its latest article. The index is
+    their ratio; the decayed weight tells how fresh and well-supported it is.
+    State is checkpointed to SQLite through the storage's connection pool
+    so historical values can be read back without replaying raw articles.
+    Processes sharing the database adopt each other's checkpoints before
+    every batch and every read, so they build on one state per ticker
+    instead of overwriting each other's.
+    """
+
+    def __init__(self, pool, half_life=None, source_weights=None, checkpoint_every=None,
+                 table_name='sentiment_index_checkpoints'):
+        config = Config()
+        self.pool = pool
+        self.table_name = table_name
+        self.half_life = (half_life or config.SENTIMENT_INDEX_HALF_LIFE).total_seconds()
+        self.checkpoint_every = (checkpoint_every or config.SENTIMENT_INDEX_CHECKPOINT_EVERY).total_seconds()
+        self.source_weights = config.SENTIMENT_SOURCE_WEIGHTS if source_weights is None else source_weights
+        # ticker -> [weighted_sum, weight, last_ts, last_checkpoint_ts]
+        self._state = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._initialize_table()
+        self.load()
+
+    def _initialize_table(self):
+        """Create the checkpoint table if it doesn't exist"""
+        with self.pool.writer() as conn:
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                ticker TEXT NOT NULL,
+                ts REAL NOT NULL,
+                weighted_sum REAL NOT NULL,
+                weight REAL NOT NULL,
+                PRIMARY KEY (ticker, ts)
+            )
+            """)
+
+    def load(self):
+        """Restore the latest checkpoint of every ticker"""
+        with self._lock:
+            self._state = {}
+            self._dirty.clear()
+            self.refresh()
+
+    def refresh(self, conn=None):
+        """Adopt the latest checkpoint of every ticker without unsaved updates here.
+
+        Those tickers' live state equals their last checkpoint unless another
+        process has checkpointed since, so this only picks up other processes'
+        articles.
+        """
+        if conn is None:
+            with self._lock, self.pool.reader() as conn:
+                return self.refresh(conn)
+        with self._lock:
+            # Read under the lock, so a batch committed meanwhile can't be rolled back to older rows
+            rows = conn.execute(f"""
+            SELECT c.ticker, c.ts, c.weighted_sum, c.weight
+            FROM {self.table_name} c
+            JOIN (SELECT ticker, MAX(ts) AS ts FROM {self.table_name} GROUP BY ticker) latest
+            USING (ticker, ts)
+            """).fetchall()
+            for ticker, ts, weighted_sum, weight in rows:
+                if ticker not in self._dirty:
+                    self._state[ticker] = [weighted_sum, weight, ts, ts]
+
+    def _decay(self, elapsed):
+        return 0.5 ** (elapsed / self.half_life)
+
+    def update(self, ticker, score, published, source=None, conn=None):
+        """Fold one article's score into the ticker's index.
+
+        A checkpoint that falls due is written on ``conn`` when given (the
+        caller's write transaction), otherwise in a transaction of its own.
+        """
+        ts = _to_epoch(published)
+        weight = self.source_weights.get(source, 1.0)
+        with self._lock:
+            if conn is None and self._checkpoint_due(ticker, ts):
+                with self.pool.writer() as conn:
+                    return self._update(ticker, score, ts, weight, conn)
+            self._update(ticker, score, ts, weight, conn)
+
+    def _checkpoint_due(self, ticker, ts):
+        state = self._state.get(ticker)
+        return state is None or max(ts, state[2]) - state[3] >= self.checkpoint_every
+
+    def _update(self, ticker, score, ts, weight, conn):
+        state = self._state.get(ticker)
+
+        if state is None:
+            state = self._state[ticker] = [weight * score, weight, ts, float('-inf')]
+        elif ts >= state[2]:
+            decay = self._decay(ts - state[2])
+            state[0] = state[0] * decay + weight * score
+            state[1] = state[1] * decay + weight
+            state[2] = ts
+        else:
+            # Late arrival: discount it to the ticker's current reference time
+            decay = self._decay(state[2] - ts)
+            state[0] += weight * score * decay
+            state[1] += weight * decay
+
+        self._dirty.add(ticker)
+        if state[2] - state[3] >= self.checkpoint_every:
+            self._write_checkpoint(ticker, conn)
+
+    def update_batch(self, df, score_col='compound', ticker_sentiment=None):
+        """Feed newly scored articles in publication order, then checkpoint.
+
+        Provider per-ticker scores in ``ticker_sentiment`` take precedence over
+        the article-wide score.
+        """
+        if df.empty or score_col not in df.columns:
+            return
+
+        scores = explode_ticker_scores(df, ticker_sentiment, score_col=score_col)
+        scores['published'] = pd.to_datetime(scores['published'], utc=True, errors='coerce')
+        scores = scores.dropna(subset=['published', 'score']).sort_values('published', kind='stable')
+        with self._lock, self.pool.writer() as conn:
+            # The database's write lock is held from the refresh to the checkpoint,
+            # so no other process can checkpoint in between and be overwritten
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            self.refresh(conn)
+            for ticker, score, published, source in zip(scores['ticker'], scores['score'],
+                                                        scores['published'], scores['source']):
+                self.update(ticker, float(score), published, source, conn=conn)
+            self.checkpoint(conn)
+
+    def _write_checkpoint(self, ticker, conn):
+        weighted_sum, weight, ts, _ = state = self._state[ticker]
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table_name} (ticker, ts, weighted_sum, weight) VALUES (?, ?, ?, ?)",
+            (ticker, ts, weighted_sum, weight)
+        )
+        state[3] = ts
+        self._dirty.discard(ticker)
+
+    def checkpoint(self, conn=None):
+        """Persist the current state of every ticker updated since its last checkpoint"""
+        if conn is None:
+            with self._lock, self.pool.writer() as conn:
+                return self.checkpoint(conn)
+        with self._lock:
+            for ticker in list(self._dirty):
+                self._write_checkpoint(ticker, conn)
+
+    def prune(self, before, conn=None, limit=-1):
+        """Drop checkpoints older than ``before``, keeping the latest of every ticker.
+
+        At most ``limit`` checkpoints go per call; returns how many did.
+        """
+        if conn is None:
+            with self.pool.writer() as conn:
+                return self.prune(before, conn, limit)
+        return conn.execute(f"""
+        DELETE FROM {self.table_name} WHERE rowid IN (
+            SELECT rowid FROM {self.table_name} c
+            WHERE ts < ?
+            AND ts < (SELECT MAX(ts) FROM {self.table_name} latest WHERE latest.ticker = c.ticker)
+            LIMIT ?
+        )
+        """, (_to_epoch(before), limit)).rowcount
+
+    def _state_at(self, ticker, ts):
+        with self._lock:
+            state = self._state.get(ticker)
+            if state is not None and ts >= state[2]:
+                return state[0], state[1], state[2]
+
+        # Earlier than the live state: start from the closest checkpoint before ts
+        with self.pool.reader() as conn:
+            row = conn.execute(f"""
+            SELECT weighted_sum, weight, ts FROM {self.table_name}
+            WHERE ticker = ? AND ts <= ?
+            ORDER BY ts DESC LIMIT 1
+            """, (ticker, ts)).fetchone()
+        return row
+
+    def value(self, ticker, at=None):
+        """Index of one ticker at a timestamp (default now), or None if it has no articles yet"""
+        ts = _to_epoch(at) if at is not None else time.time()
+        self.refresh()
+        state = self._state_at(ticker, ts)
+        if state is None or state[1] == 0:
+            return None
+        return state[0] / state[1]
+
+    def snapshot(self, at=None, tickers=None):
+        """Index and decayed weight of every (or the given) ticker at a timestamp"""
+        ts = _to_epoch(at) if at is not None else time.time()
+        self.refresh()
+        rows = []
+        with self._lock:
+            tickers = tickers or sorted(self._state)
+        for ticker in tickers:
+            state = self._state_at(ticker, ts)
+            if state is None or state[1] == 0:
+                continue
+            weighted_sum, weight, state_ts = state
+            rows.append({
+                'ticker': ticker,
+                'index': weighted_sum / weight,
+                'weight': weight * self._decay(ts - state_ts)
+            })
+        return pd.DataFrame(rows, columns=['ticker', 'index', 'weight'])
+
+
+def _to_epoch(value):
+    """Seconds since the epoch; naive timestamps are taken as UTC"""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return ts.timestamp()
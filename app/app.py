@@ -2,13 +2,26 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
+import hashlib
+import math
 import os
+import queue
+import time
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import numpy as np
-
-# Initialize sentiment analyzer
-analyzer = SentimentIntensityAnalyzer()
+from storage.database import DatabaseStorage
+from storage.file_storage import ParquetStore, ARTICLE_SCHEMA
+from storage.snapshot import write_snapshot, read_snapshot_table, snapshot_frame
+from storage.duckdb_storage import DuckDBStorage
+from storage.aggregates import sentiment_labels
+from analyzers.anomaly_detector import AnomalyDetector, FileAlertSink, QueueAlertSink
+from config import settings
+from utils.downsample import histogram
+from processors.ticker_index import TickerIndex
+from processors.ticker_sentiment import normalize_ticker_sentiment, provider_to_compound, TICKER_SENTIMENT_COLUMNS
 
 # Set up page configuration
 st.set_page_config(
@@ -20,7 +33,10 @@ st.set_page_config(
 # Configuration
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
-DATA_FILE = os.path.join(DATA_DIR, "financial_news.csv")
+DATA_FILE = os.path.join(DATA_DIR, "financial_news.csv")  # Legacy store, migrated on first run
+PARQUET_DIR = os.path.join(DATA_DIR, "financial_news")
+SNAPSHOT_FILE = os.path.join(DATA_DIR, "financial_news.arrow")  # Working window, memory-mapped on load
+SNAPSHOT_COLUMNS = [name for name in ARTICLE_SCHEMA.names if name != 'content']  # Bodies are read from the database
 
 # API Configuration - Replace with your actual keys
 API_CONFIG = {
@@ -36,6 +52,44 @@ TOPICS = {
     "Healthcare": ["PFE", "JNJ", "UNH", "MRK", "ABT"]
 }
 
+SENTIMENT_LABELS = ['negative', 'neutral', 'positive']
+
+# Sort orders of the article table: label -> (column, descending)
+ARTICLE_SORTS = {
+    "Newest first": ('published', True),
+    "Oldest first": ('published', False),
+    "Most positive": ('sentiment_score', True),
+    "Most negative": ('sentiment_score', False),
+    "Source": ('source', False)
+}
+
+# Fetching, normalizing and scoring are cached on their inputs, so reruns caused by
+# filter widgets never hit the APIs or rescore; storing writes only new articles
+CACHE_TTL = settings.DASHBOARD_CACHE_TTL
+REFRESH_POLL_SECONDS = 2  # How often the page checks on a running refresh
+ALERTS_SHOWN = 20  # Latest anomaly alerts listed on the dashboard
+
+class FetchError(Exception):
+    """A news API call failed; the message is shown as that source's status"""
+
+def frame_key(df):
+    """Content hash of a DataFrame whose cells may hold lists or dicts.
+    
+    Streamlit hashes such frames by pickling them, and equal frames don't
+    pickle to equal bytes, so the cached stages downstream would never hit.
+    """
+    cells = df.apply(lambda col: col.map(repr) if col.dtype == object else col)
+    values = pd.util.hash_pandas_object(cells, index=True).to_numpy().tobytes()
+    return hashlib.md5(values + repr(list(df.columns)).encode()).hexdigest()
+
+FRAME_HASH = {pd.DataFrame: frame_key}
+
+@st.cache_resource
+def get_analyzer():
+    """One sentiment analyzer shared by every session"""
+    return SentimentIntensityAnalyzer()
+
+@st.cache_data(ttl=CACHE_TTL['fetch'], show_spinner=False)
 def fetch_newsapi_articles(tickers, days_back):
     """Fetch articles from NewsAPI using direct API calls"""
     try:
@@ -67,11 +121,11 @@ def fetch_newsapi_articles(tickers, days_back):
         
         return pd.DataFrame(all_articles)
     except requests.exceptions.RequestException as e:
-        st.warning(f"NewsAPI request failed: {str(e)}")
+        raise FetchError(f"NewsAPI request failed: {str(e)}") from e
     except Exception as e:
-        st.warning(f"NewsAPI Error: {str(e)}")
-    return pd.DataFrame()
+        raise FetchError(f"NewsAPI Error: {str(e)}") from e
 
+@st.cache_data(ttl=CACHE_TTL['fetch'], show_spinner=False)
 def fetch_alphavantage_news(tickers, days_back):
     """Fetch news from Alpha Vantage with enhanced error handling"""
     try:
@@ -91,16 +145,15 @@ def fetch_alphavantage_news(tickers, days_back):
         response = requests.get(base_url, params=params)
         response.raise_for_status()
         data = response.json()
-        
-        if 'feed' in data:
-            return pd.DataFrame(data['feed'])
-        st.warning("AlphaVantage returned no news feed")
     except requests.exceptions.RequestException as e:
-        st.warning(f"AlphaVantage request failed: {str(e)}")
+        raise FetchError(f"AlphaVantage request failed: {str(e)}") from e
     except Exception as e:
-        st.warning(f"AlphaVantage processing error: {str(e)}")
-    return pd.DataFrame()
+        raise FetchError(f"AlphaVantage processing error: {str(e)}") from e
+    if 'feed' not in data:
+        raise FetchError("AlphaVantage returned no news feed")
+    return pd.DataFrame(data['feed'])
 
+@st.cache_data(ttl=CACHE_TTL['fetch'], show_spinner=False)
 def fetch_finnhub_news(tickers, days_back):
     """Fetch news from Finnhub with better error handling"""
     try:
@@ -128,11 +181,11 @@ def fetch_finnhub_news(tickers, days_back):
         
         return pd.DataFrame(all_articles)
     except requests.exceptions.RequestException as e:
-        st.warning(f"Finnhub request failed: {str(e)}")
+        raise FetchError(f"Finnhub request failed: {str(e)}") from e
     except Exception as e:
-        st.warning(f"Finnhub processing error: {str(e)}")
-    return pd.DataFrame()
+        raise FetchError(f"Finnhub processing error: {str(e)}") from e
 
+@st.cache_data(ttl=CACHE_TTL['normalize'], show_spinner=False, hash_funcs=FRAME_HASH)
 def normalize_data(df, source):
     """Normalize data from different APIs to common format with better datetime handling"""
     if df.empty:
@@ -160,7 +213,9 @@ def normalize_data(df, source):
                 'url': df['url'].astype(str),
                 'urlToImage': '',
                 'tickers': df.get('ticker_sentiment', []).apply(
-                    lambda x: [item['ticker'] for item in x] if isinstance(x, list) else [])
+                    lambda x: [item['ticker'] for item in x] if isinstance(x, list) else []),
+                'provider_score': pd.to_numeric(df['overall_sentiment_score'], errors='coerce')
+                    if 'overall_sentiment_score' in df.columns else float('nan')
             })
         
         elif source == "finnhub":
@@ -181,29 +236,132 @@ def normalize_data(df, source):
         st.warning(f"Error normalizing {source} data: {str(e)}")
         return pd.DataFrame()
 
-def update_data_store(new_data):
-    """Update or create the CSV file with new data, with better datetime handling"""
-    try:
-        if os.path.exists(DATA_FILE):
-            existing_data = pd.read_csv(DATA_FILE)
-            if 'published' in existing_data.columns:
-                existing_data['published'] = pd.to_datetime(existing_data['published'], utc=True, errors='coerce')
-            combined_data = pd.concat([existing_data, new_data])
-            combined_data = combined_data.drop_duplicates(
-                subset=['title', 'source', 'published'],
-                keep='last'
-            )
-        else:
-            combined_data = new_data
-        
-        os.makedirs(DATA_DIR, exist_ok=True)
-        combined_data.to_csv(DATA_FILE, index=False)
-        return combined_data
+@st.cache_resource
+def get_database():
+    """The SQLite article store behind search, aggregates and the sentiment index, shared by every session"""
+    return DatabaseStorage()
+
+@st.cache_resource
+def get_alert_sink():
+    """Queue the anomaly detector hands its alerts to for the dashboard"""
+    return QueueAlertSink()
+
+@st.cache_resource
+def get_recent_alerts():
+    """The latest alerts drained from the queue, newest first, shared by every session"""
+    return deque(maxlen=ALERTS_SHOWN)
+
+@st.cache_resource
+def get_anomaly_detector():
+    """Spike detection over newly stored articles, checkpointed next to the sentiment index"""
+    return AnomalyDetector(
+        sinks=[FileAlertSink(settings.ANOMALY_CONFIG['alerts_path']), get_alert_sink()],
+        pool=get_database().pool
+    )
+
+def recent_alerts():
+    """Move queued alerts into the recent list and return it"""
+    recent = get_recent_alerts()
+    alert_queue = get_alert_sink().queue
+    while True:
+        try:
+            recent.appendleft(alert_queue.get_nowait())
+        except queue.Empty:
+            return list(recent)
+
+@st.cache_resource
+def get_duckdb():
+    """DuckDB over the Parquet store, shared by every session; its view follows new segments"""
+    return DuckDBStorage(PARQUET_DIR, settings.DATABASE_CONFIG['db_path'])
+
+def get_analytics(db):
+    """Aggregations for the charts: SQLite rollups, or DuckDB over the Parquet store when configured"""
+    if settings.ANALYTICS_BACKEND == 'duckdb':
+        return get_duckdb()
+    return db.rollups
+
+def _to_storage_rows(df):
+    """Map dashboard columns onto the DatabaseStorage schema"""
+    return df.assign(source_name=df['source'], sentiment_score=df['compound'], type='news')
+
+@st.cache_resource
+def get_file_store():
+    """The partitioned Parquet article history, shared by every session"""
+    return ParquetStore(PARQUET_DIR)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_ticker_index(path, version, _tickers):
+    """Ticker index of one snapshot version, built once and shared by every session and view"""
+    return TickerIndex.from_arrow(_tickers)
+
+def load_snapshot(path):
+    """The published snapshot and its ticker index"""
+    stat = os.stat(path)
+    table = read_snapshot_table(path)
+    ticker_index = get_ticker_index(path, (stat.st_mtime_ns, stat.st_size), table.column('tickers'))
+    if len(ticker_index) != table.num_rows:
+        # Replaced between the stat and the read; this read gets its own index
+        ticker_index = TickerIndex.from_arrow(table.column('tickers'))
+    return snapshot_frame(table), ticker_index
+
+def store_articles(new_data, ticker_sentiment=None):
+    """Append a scored batch to the Parquet history, mirror it into SQLite and publish
+    the working window; returns how many articles were new.
     
-    except Exception as e:
-        st.error(f"Error updating data store: {str(e)}")
-        return new_data
+    Not cached: it writes, so the dedupe is explicit instead. The Parquet
+    store reports which articles it hadn't seen, and a batch with none
+    leaves the snapshot alone. SQLite is mirrored by url on every batch,
+    whether or not the rows were new to Parquet, so a batch whose mirror
+    failed is caught up when the same articles are fetched again.
+    """
+    store = get_file_store()
+    migrated = 0
+    if os.path.exists(DATA_FILE):
+        # Rows stored before sentiment was persisted with them get scored while migrating
+        migrated = store.migrate_csv(DATA_FILE, transform=_score_missing)
+        st.info(f"Migrated {migrated} articles from {DATA_FILE} to {PARQUET_DIR}")
+    
+    inserted = store.append(new_data)
+    window_start = pd.Timestamp.now(tz='UTC') - timedelta(days=settings.DATA_STORAGE_DAYS)
+    if not inserted.empty or migrated or not os.path.exists(SNAPSHOT_FILE):
+        store.flush()
+        store.compact_in_background()
+        # Publish the working window for page loads to memory-map; bodies stay out of it
+        write_snapshot(store.read(columns=SNAPSHOT_COLUMNS, start_date=window_start), SNAPSHOT_FILE)
+    
+    # Mirror the batch into the SQLite store, which skips the urls it has; the first run backfills the history
+    db = get_database()
+    stored = db.save_data(
+        _to_storage_rows(store.read(start_date=window_start) if db.is_empty() else new_data),
+        ticker_sentiment
+    )
+    db.sentiment_index.update_batch(
+        stored,
+        score_col='sentiment_score',
+        ticker_sentiment=ticker_sentiment
+    )
+    # Flag volume and sentiment spikes against each ticker's rolling baseline
+    get_anomaly_detector().observe_batch(
+        stored,
+        score_col='sentiment_score',
+        ticker_sentiment=ticker_sentiment
+    )
+    # Apply SQLite retention off the script thread, as the Parquet store's compaction does
+    db.cleanup_in_background()
+    return len(inserted)
+
+def _score_missing(df):
+    """Score only the rows that don't carry sentiment yet"""
+    score_cols = ['neg', 'neu', 'pos', 'compound', 'sentiment_label']
+    df = df.reset_index(drop=True)
+    missing = df['compound'].isna() if 'compound' in df.columns else pd.Series(True, index=df.index)
+    scored = analyze_sentiment(df.loc[missing].drop(columns=score_cols, errors='ignore'))
+    scored.index = df.index[missing]
+    for col in score_cols:
+        df.loc[missing, col] = scored[col]
+    return df
 
+@st.cache_data(ttl=CACHE_TTL['score'], show_spinner=False, hash_funcs=FRAME_HASH)
 def analyze_sentiment(df):
     """Perform sentiment analysis with proper index handling"""
     if df.empty:
@@ -216,20 +374,32 @@ def analyze_sentiment(df):
             st.warning("No content column available for sentiment analysis")
             return df
         
+        # Articles the provider (Alpha Vantage) scored aren't scored again locally
+        if 'provider_score' in df.columns:
+            needs_scoring = df['provider_score'].isna()
+        else:
+            needs_scoring = pd.Series(True, index=df.index)
+        
         sentiments = []
-        for content in df['content'].fillna(''):
+        for content in df.loc[needs_scoring, 'content'].fillna(''):
             try:
                 clean_content = ' '.join(str(content).split())
-                sentiments.append(analyzer.polarity_scores(clean_content))
+                sentiments.append(get_analyzer().polarity_scores(clean_content))
             except Exception as e:
                 st.warning(f"Error analyzing sentiment for content: {str(e)}")
                 sentiments.append({'neg': 0, 'neu': 1, 'pos': 0, 'compound': 0})
         
-        sentiment_df = pd.DataFrame(sentiments)
+        sentiment_df = pd.DataFrame(
+            sentiments,
+            index=df.index[needs_scoring],
+            columns=['neg', 'neu', 'pos', 'compound']
+        ).reindex(df.index)
+        if 'provider_score' in df.columns:
+            # The raw score stays in provider_score; compound gets it rescaled onto VADER's scale.
+            # neg/neu/pos are VADER's own proportions and stay empty for these articles
+            sentiment_df['compound'] = sentiment_df['compound'].fillna(provider_to_compound(df['provider_score']))
         
         if not sentiment_df.empty:
-            sentiment_df = sentiment_df.reset_index(drop=True)
-            df = df.reset_index(drop=True)
             df = pd.concat([df, sentiment_df], axis=1)
             
             if 'compound' in df.columns:
@@ -262,6 +432,90 @@ def analyze_sentiment(df):
             df['sentiment_label'] = 'neutral'
         return df
 
+# Selectable sources: fetcher and the name normalize_data knows it by
+FETCHERS = {
+    "NewsAPI": (fetch_newsapi_articles, "newsapi"),
+    "AlphaVantage": (fetch_alphavantage_news, "alphavantage"),
+    "Finnhub": (fetch_finnhub_news, "finnhub")
+}
+
+@st.cache_resource
+def get_fetch_pool():
+    """Worker threads for the API calls of every session's refresh"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix='news-fetch')
+
+class RefreshJob:
+    """A background refresh of the selected sources, stored one source at a time.
+    
+    Only the API calls run on the worker threads, all at once. Normalizing,
+    scoring and storing happen on the script thread when ``collect`` picks up
+    a finished fetch, so they go through the Streamlit caches as usual and a
+    slow API holds up nobody but itself.
+    """
+    
+    def __init__(self, tickers, sources, days_back):
+        self.key = (tickers, sources, days_back)
+        self.started = time.time()
+        pool = get_fetch_pool()
+        self.futures = {source: pool.submit(FETCHERS[source][0], tickers, days_back) for source in sources}
+        self.pending = set(sources)
+        self.status = {}
+        self.errors = {}
+    
+    def done(self):
+        return not self.pending
+    
+    def expired(self):
+        return time.time() - self.started > CACHE_TTL['fetch']
+    
+    def collect(self):
+        """Store every source whose fetch has finished; returns whether any new articles came in"""
+        stored = False
+        for source in [s for s in self.futures if s in self.pending and self.futures[s].done()]:
+            self.pending.discard(source)
+            try:
+                raw = self.futures[source].result()
+                normalized = normalize_data(raw, FETCHERS[source][1])
+                if normalized.empty:
+                    self.status[source] = "no articles"
+                    continue
+                if source == "AlphaVantage":
+                    ticker_sentiment = normalize_ticker_sentiment(raw)
+                else:
+                    ticker_sentiment = pd.DataFrame(columns=TICKER_SENTIMENT_COLUMNS)
+                new = store_articles(analyze_sentiment(normalized), ticker_sentiment)
+                self.status[source] = f"{len(normalized)} articles, {new} new"
+                stored = stored or new > 0
+            except Exception as e:
+                self.errors[source] = str(e)
+        return stored
+
+def start_refresh(tickers, sources, days_back):
+    """The session's refresh for this selection; a new one starts when the selection
+    changes or the last one is older than the fetch cache"""
+    job = st.session_state.get('refresh_job')
+    if job is None or job.key != (tickers, sources, days_back) or (job.done() and job.expired()):
+        job = st.session_state['refresh_job'] = RefreshJob(tickers, sources, days_back)
+    return job
+
+def show_refresh_status(job):
+    """Per-source refresh status, polled while fetches are still running"""
+    polling = not job.done()
+    st.fragment(run_every=REFRESH_POLL_SECONDS if polling else None)(_show_refresh_status)(job, polling)
+
+def _show_refresh_status(job, polling):
+    # New articles, or the last source finishing, repaint the whole page (which also stops the polling)
+    if polling and (job.collect() or job.done()):
+        st.rerun()
+    columns = st.columns(len(job.futures))
+    for column, source in zip(columns, job.futures):
+        if source in job.errors:
+            column.warning(f"{source}: {job.errors[source]}")
+        elif source in job.pending:
+            column.info(f"{source}: fetching...")
+        else:
+            column.success(f"{source}: {job.status[source]}")
+
 def show_sidebar():
     """Render the sidebar controls with enhanced layout"""
     with st.sidebar:
@@ -298,17 +552,19 @@ def show_sidebar():
         
         return selected_tickers, selected_sources, days_back, min_sentiment
 
-def show_main_content(df, min_sentiment):
+def show_main_content(df, ticker_index, tickers, min_sentiment):
     """Render the main dashboard content with enhanced visualizations"""
     if df.empty:
         st.warning("No news articles match your filters")
         return
     
+    # Articles of the selected tickers, found through the shared index instead of exploding the list column
+    in_view = ticker_index.mask(tickers)
     if 'compound' not in df.columns:
         st.error("Sentiment analysis data not available - showing all articles")
-        filtered_df = df
     else:
-        filtered_df = df[df['compound'] >= min_sentiment]
+        in_view &= (df['compound'] >= min_sentiment).to_numpy()
+    filtered_df = df[in_view]
 
     if filtered_df.empty:
         st.warning("No articles match your sentiment filter")
@@ -319,13 +575,22 @@ def show_main_content(df, min_sentiment):
 
     st.subheader("📊 Summary Metrics")
     col1, col2, col3, col4 = st.columns(4)
-    avg_sentiment = df['compound'].mean()
+    avg_sentiment = filtered_df['compound'].mean()
     col1.metric("📈 Average Sentiment", 
                f"{avg_sentiment:.2f}", 
                "Positive" if avg_sentiment > 0 else "Negative")
-    col2.metric("📰 Total Articles", len(df))
-    col3.metric("🏢 Sources", df['source'].nunique())
-    col4.metric("💵 Tickers Covered", df['tickers'].explode().nunique())
+    col2.metric("📰 Total Articles", len(filtered_df))
+    col3.metric("🏢 Sources", filtered_df['source'].nunique())
+    # Every ticker the shown articles mention, co-mentions included
+    col4.metric("💵 Tickers Covered", len(ticker_index.aggregate(df['compound'], where=in_view)))
+    
+    db = get_database()
+    analytics = get_analytics(db)
+    # Rollups span every ticker and all history; scope them to the selection and the snapshot window
+    scope = dict(
+        tickers=list(tickers),
+        start_day=(pd.Timestamp.now(tz='UTC') - timedelta(days=settings.DATA_STORAGE_DAYS)).date()
+    )
     
     tab1, tab2, tab3, tab4 = st.tabs([
         "📈 Sentiment Trends", 
@@ -336,8 +601,9 @@ def show_main_content(df, min_sentiment):
     
     with tab1:
         st.subheader("📈 Sentiment Over Time")
-        df['date'] = pd.to_datetime(df['published']).dt.date
-        daily_sentiment = df.groupby(['date', 'sentiment_label']).size().unstack().fillna(0)
+        daily_sentiment = analytics.query(by=['day', 'label'], **scope).pivot(
+            index='day', columns='label', values='count'
+        ).fillna(0).rename_axis('date')
         
         fig1 = px.area(
             daily_sentiment,
@@ -353,12 +619,17 @@ def show_main_content(df, min_sentiment):
         st.plotly_chart(fig1, use_container_width=True)
         
         st.subheader("📊 Sentiment Distribution")
-        fig2 = px.histogram(
-            df,
-            x='compound',
-            nbins=20,
+        # Binned here, so the browser gets 20 bars per label rather than every score
+        distribution = pd.concat([
+            histogram(group['compound'], bins=20).assign(sentiment_label=label)
+            for label, group in filtered_df.groupby('sentiment_label')
+        ], ignore_index=True)
+        fig2 = px.bar(
+            distribution,
+            x='bin',
+            y='count',
             title="Sentiment Score Distribution",
-            labels={'compound': 'Sentiment Score'},
+            labels={'bin': 'Sentiment Score', 'count': 'count'},
             color='sentiment_label',
             color_discrete_map={
                 'positive': '#2ecc71',
@@ -366,19 +637,20 @@ def show_main_content(df, min_sentiment):
                 'negative': '#e74c3c'
             }
         )
+        fig2.update_layout(bargap=0)
         st.plotly_chart(fig2, use_container_width=True)
     
     with tab2:
         st.subheader("🏷️ Ticker Sentiment Comparison")
         try:
-            exploded_df = df.explode('tickers')
-            exploded_df = exploded_df[exploded_df['tickers'].notna()]
+            ticker_sentiment = db.aggregates.all_time()
+            ticker_sentiment = ticker_sentiment[ticker_sentiment['ticker'].isin(tickers)]
             
-            if not exploded_df.empty:
-                ticker_sentiment = exploded_df.groupby('tickers', observed=True).agg(
-                    mean_sentiment=('compound', 'mean'),
-                    article_count=('title', 'count')
-                ).sort_values('mean_sentiment')
+            if not ticker_sentiment.empty:
+                ticker_sentiment = ticker_sentiment.rename(columns={
+                    'mean': 'mean_sentiment',
+                    'count': 'article_count'
+                }).set_index('ticker').sort_values('mean_sentiment')
                 
                 fig = px.bar(
                     ticker_sentiment,
@@ -400,6 +672,55 @@ def show_main_content(df, min_sentiment):
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.warning("No ticker data available after processing")
+            
+            st.subheader("🗓️ Daily Sentiment by Ticker")
+            ticker_daily = analytics.query(by=['day', 'ticker'], **scope).pivot(
+                index='ticker', columns='day', values='mean'
+            )
+            if not ticker_daily.empty:
+                fig = px.imshow(
+                    ticker_daily,
+                    color_continuous_scale='RdYlGn',
+                    zmin=-1,
+                    zmax=1,
+                    labels={'x': 'Date', 'y': 'Ticker', 'color': 'Sentiment'},
+                    aspect='auto'
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader("⚡ Current Sentiment Index")
+            live_index = db.sentiment_index.snapshot()
+            if not live_index.empty:
+                st.caption("Time-decayed sentiment per ticker; weight shrinks as news gets older")
+                st.dataframe(
+                    live_index.sort_values('weight', ascending=False),
+                    column_config={
+                        "ticker": "Ticker",
+                        "index": st.column_config.NumberColumn("Index", format="%.2f"),
+                        "weight": st.column_config.NumberColumn("Weight", format="%.2f")
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+            
+            alerts = recent_alerts()
+            if alerts:
+                st.subheader("🚨 Recent Alerts")
+                st.caption("Volume and sentiment spikes against each ticker's rolling baseline")
+                st.dataframe(
+                    pd.DataFrame(alerts)[['detected_at', 'ticker', 'kind', 'direction', 'value', 'baseline', 'title']],
+                    column_config={
+                        "detected_at": "Detected",
+                        "ticker": "Ticker",
+                        "kind": "Alert",
+                        "direction": "Direction",
+                        "value": st.column_config.NumberColumn("Value", format="%.2f"),
+                        "baseline": st.column_config.NumberColumn("Baseline", format="%.2f"),
+                        "title": "Article"
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
         except Exception as e:
             st.error(f"Error in ticker comparison: {str(e)}")
     
@@ -410,7 +731,8 @@ def show_main_content(df, min_sentiment):
         
         with source_col1:
             st.markdown("#### Top Sources by Volume")
-            source_counts = df['source'].value_counts().nlargest(10)
+            source_stats = analytics.query(by=['source'], **scope).set_index('source')
+            source_counts = source_stats['count'].nlargest(10)
             fig1 = px.pie(
                 source_counts,
                 names=source_counts.index,
@@ -421,21 +743,18 @@ def show_main_content(df, min_sentiment):
         
         with source_col2:
             st.markdown("#### Sentiment by Source")
-            source_stats = df.groupby('source').agg({
-                'compound': 'mean',
-                'title': 'count'
-            }).sort_values('title', ascending=False).head(10)
+            source_stats = source_stats.sort_values('count', ascending=False).head(10)
             
             fig2 = px.bar(
                 source_stats,
-                x='compound',
+                x='mean',
                 y=source_stats.index,
                 orientation='h',
-                color='compound',
+                color='mean',
                 color_continuous_scale='RdYlGn',
                 title="Average Sentiment by Source",
-                labels={'compound': 'Avg. Sentiment', 'y': 'Source'},
-                hover_data=['title']
+                labels={'mean': 'Avg. Sentiment', 'y': 'Source'},
+                hover_data=['count']
             )
             fig2.update_layout(
                 coloraxis_showscale=True,
@@ -448,6 +767,11 @@ def show_main_content(df, min_sentiment):
         st.subheader("📋 Article Data")
         
         with st.expander("🔍 Filter Options", expanded=True):
+            search_text = st.text_input(
+                "Search Articles",
+                placeholder='e.g. earn* "rate cut" guidance',
+                help='Words must all match; use "quotes" for phrases and * for prefixes'
+            )
             filter_col1, filter_col2 = st.columns(2)
             
             with filter_col1:
@@ -460,51 +784,73 @@ def show_main_content(df, min_sentiment):
             with filter_col2:
                 sentiment_filter = st.select_slider(
                     "Filter by Sentiment",
-                    options=['negative', 'neutral', 'positive'],
+                    options=SENTIMENT_LABELS,
                     value=['negative', 'positive']
                 )
         
-        # Prepare data for display
-        display_df = df[
-            (df['source'].isin(source_filter)) & 
-            (df['sentiment_label'].isin(sentiment_filter))
-        ].sort_values('published', ascending=False).copy()
+        if not source_filter:
+            st.info("Select at least one source")
+            return
         
-        # Convert problematic columns to Arrow-compatible types
-        display_df['published'] = pd.to_datetime(display_df['published'], utc=True)
-        display_df['tickers'] = display_df['tickers'].astype(str)
-        
-        # Select only columns we want to display
-        display_df = display_df[['published', 'title', 'source', 'tickers', 'compound', 'sentiment_label']]
+        # The range slider picks every label between its two ends
+        first, last = SENTIMENT_LABELS.index(sentiment_filter[0]), SENTIMENT_LABELS.index(sentiment_filter[1])
+        filters = dict(text=search_text or None, sources=list(source_filter), labels=SENTIMENT_LABELS[first:last + 1])
+        sort_options = dict(ARTICLE_SORTS)
+        if search_text:
+            sort_options = {"Most relevant": ('rank', False), **sort_options}
         
+        sort_col, size_col, page_col = st.columns([3, 1, 1])
+        sort_by, descending = sort_options[sort_col.selectbox("Sort by", list(sort_options))]
+        page_size = size_col.selectbox("Rows per page", [25, 50, 100, 200], index=1)
         try:
-            st.dataframe(
-                display_df,
-                column_config={
-                    "published": st.column_config.DatetimeColumn(
-                        "Date",
-                        format="YYYY-MM-DD HH:mm"
-                    ),
-                    "title": "Headline",
-                    "source": "Source",
-                    "compound": st.column_config.NumberColumn(
-                        "Sentiment",
-                        format="%.2f",
-                        help="VADER compound sentiment score (-1 to 1)"
-                    ),
-                    "sentiment_label": st.column_config.TextColumn(
-                        "Label",
-                        help="Sentiment classification"
-                    )
-                },
-                hide_index=True,
-                use_container_width=True,
-                height=600
-            )
+            total = db.count_data(**filters)
         except Exception as e:
-            st.error(f"Error displaying data: {str(e)}")
-            st.write("Here's a simplified view of the data:")
-            st.table(display_df.head(20))
+            st.error(f"Error loading articles: {str(e)}")
+            return
+        pages = max(1, math.ceil(total / page_size))
+        page = int(page_col.number_input("Page", min_value=1, max_value=pages, value=1, step=1)) - 1
+        
+        # Cursors of the pages already shown, so paging forward is a range scan rather than an OFFSET
+        view = (search_text, tuple(sorted(source_filter)), tuple(filters['labels']), sort_by, descending, page_size)
+        if st.session_state.get('article_view') != view:
+            st.session_state['article_view'] = view
+            st.session_state['article_cursors'] = {}
+        cursors = st.session_state['article_cursors']
+        
+        page_df = db.page_data(**filters, sort_by=sort_by, descending=descending, page=page,
+                               page_size=page_size, after=cursors.get(page - 1))
+        cursors[page] = page_df.attrs.get('cursor')
+        st.caption(f"{total:,} articles · page {page + 1} of {pages}")
+        if page_df.empty:
+            st.info("No articles match your filters")
+            return
+        page_df['sentiment_label'] = sentiment_labels(page_df['sentiment_score'])
+        
+        st.dataframe(
+            page_df[['published', 'title', 'source', 'tickers', 'sentiment_score', 'sentiment_label', 'url']],
+            column_config={
+                "published": st.column_config.DatetimeColumn(
+                    "Date",
+                    format="YYYY-MM-DD HH:mm"
+                ),
+                "title": "Headline",
+                "source": "Source",
+                "tickers": "Tickers",
+                "sentiment_score": st.column_config.NumberColumn(
+                    "Sentiment",
+                    format="%.2f",
+                    help="VADER compound sentiment score (-1 to 1)"
+                ),
+                "sentiment_label": st.column_config.TextColumn(
+                    "Label",
+                    help="Sentiment classification"
+                ),
+                "url": st.column_config.LinkColumn("Link", display_text="open")
+            },
+            hide_index=True,
+            use_container_width=True,
+            height=600
+        )
 
 def main():
     """Main application function with enhanced setup checks"""
@@ -554,53 +900,23 @@ def main():
         st.warning("Please select at least one data source")
         return
     
-    with st.spinner("🔍 Fetching and analyzing news data..."):
-        all_data = pd.DataFrame()
-        
-        if "NewsAPI" in sources:
-            with st.expander("NewsAPI Progress", expanded=False):
-                st.info("Fetching from NewsAPI...")
-                newsapi_data = fetch_newsapi_articles(tickers, days_back)
-                st.info(f"Found {len(newsapi_data)} raw articles")
-                newsapi_normalized = normalize_data(newsapi_data, "newsapi")
-                st.info(f"Normalized to {len(newsapi_normalized)} articles")
-                all_data = pd.concat([all_data, newsapi_normalized], ignore_index=True)
-        
-        if "AlphaVantage" in sources:
-            with st.expander("AlphaVantage Progress", expanded=False):
-                st.info("Fetching from AlphaVantage...")
-                av_data = fetch_alphavantage_news(tickers, days_back)
-                st.info(f"Found {len(av_data)} raw articles")
-                av_normalized = normalize_data(av_data, "alphavantage")
-                st.info(f"Normalized to {len(av_normalized)} articles")
-                all_data = pd.concat([all_data, av_normalized], ignore_index=True)
-        
-        if "Finnhub" in sources:
-            with st.expander("Finnhub Progress", expanded=False):
-                st.info("Fetching from Finnhub...")
-                finnhub_data = fetch_finnhub_news(tickers, days_back)
-                st.info(f"Found {len(finnhub_data)} raw articles")
-                finnhub_normalized = normalize_data(finnhub_data, "finnhub")
-                st.info(f"Normalized to {len(finnhub_normalized)} articles")
-                all_data = pd.concat([all_data, finnhub_normalized], ignore_index=True)
-        
-        if not all_data.empty:
-            with st.spinner("💾 Saving data..."):
-                updated_data = update_data_store(all_data)
-                st.success(f"Data store updated with {len(updated_data)} total articles")
-            
-            with st.spinner("🧠 Analyzing sentiment..."):
-                analyzed_data = analyze_sentiment(updated_data)
-                st.success("Sentiment analysis complete")
-            
-            show_main_content(analyzed_data, min_sentiment)
-        else:
-            st.warning("""
-            No articles found. Try:
-            - Different tickers
-            - More data sources
-            - A longer time period
-            """)
+    # Sorted so the fetch caches don't depend on selection order
+    job = start_refresh(tuple(sorted(tickers)), tuple(sources), days_back)
+    job.collect()
+    show_refresh_status(job)
+    
+    # Paint from the published snapshot right away; the refresh repaints as sources land
+    if os.path.exists(SNAPSHOT_FILE):
+        show_main_content(*load_snapshot(SNAPSHOT_FILE), tickers, min_sentiment)
+    elif not job.done():
+        st.info("Fetching the first articles...")
+    else:
+        st.warning("""
+        No articles found. Try:
+        - Different tickers
+        - More data sources
+        - A longer time period
+        """)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
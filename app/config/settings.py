@@ -24,26 +24,123 @@ API_KEYS = {
 # Database configuration
 DATABASE_CONFIG = {
     'db_path': os.path.join(BASE_DIR, 'data', 'news_data.db'),
-    'table_name': 'financial_news'
+    'table_name': 'financial_news',
+    'read_connections': 4,       # Size of the read-only connection pool
+    'write_chunk_size': 5000,    # Rows per write transaction in save_data
+    'retention_batch_size': 1000, # Rows per delete transaction in cleanup_old_data
+    'vacuum_pages': 256,         # Free pages handed back to the OS after each delete batch
+    'query_cache_bytes': 256 * 1024 * 1024,  # Memory budget of the load_data/search result cache; 0 disables it
+    'pragmas': {
+        'journal_mode': 'WAL',   # Readers and the writer don't block each other
+        'synchronous': 'NORMAL', # Durable at checkpoints, safe from corruption under WAL
+        'cache_size': -65536,    # 64 MiB page cache per connection
+        'mmap_size': 268435456,  # Map up to 256 MiB of the file
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,    # ms to wait on a lock held by another process
+        'auto_vacuum': 'INCREMENTAL'  # Deleted pages are reclaimed by incremental_vacuum
+    }
+}
+
+# zstd-compressed article bodies, kept apart from the articles table
+BODY_STORAGE_CONFIG = {
+    'level': 9,              # zstd compression level
+    'dict_size': 112640,     # Bytes of the shared dictionary trained on stored bodies
+    'train_samples': 500     # Non-empty bodies needed before a dictionary is trained
 }
 
 # Other settings
 MAX_TICKERS_PER_REQUEST = 5  # Limit to avoid API rate limits
 DATA_STORAGE_DAYS = 30       # How many days of data to keep
 CACHE_TTL = 3600             # Cache time-to-live in seconds
+
+# Streamlit cache lifetimes of the dashboard stages, in seconds
+DASHBOARD_CACHE_TTL = {
+    'fetch': 900,        # Raw API responses; bounds how stale the news can get
+    'normalize': CACHE_TTL,
+    'score': CACHE_TTL
+}
 DEFAULT_TICKERS = ['IBM','AAPL', 'MSFT', 'GOOG']  # Add default tickers
 TIME_WINDOW = timedelta(days=7)  # Default time window
 
+# Partitioned Parquet article store used by the Streamlit dashboard
+FILE_STORAGE_CONFIG = {
+    'root': os.path.join(BASE_DIR, 'data', 'financial_news'),
+    'partition_by': ['day'],                 # add 'source' to also split each day by source
+    'key': ['title', 'source', 'published'], # Hashed into the stable article id
+    'buffer_rows': 10000,                    # Rows held in memory before a segment is flushed
+    'max_segments': 8,                       # Segments per partition before compaction merges them
+    'retention_days': DATA_STORAGE_DAYS      # Compaction drops older day partitions; None keeps all
+}
+
+# Analytical queries: 'sqlite' reads the rollup tables, 'duckdb' scans the Parquet store with DuckDB
+ANALYTICS_BACKEND = os.getenv('ANALYTICS_BACKEND', 'sqlite')
+DUCKDB_CONFIG = {
+    'threads': None,       # None uses every core
+    'memory_limit': None   # e.g. '4GB'; None keeps DuckDB's default
+}
+
+# Sentiment scoring
+SENTIMENT_MODELS = [m.strip() for m in os.getenv('SENTIMENT_MODELS', 'vader').split(',')]  # 'vader', 'textblob' or both
+SENTIMENT_THRESHOLDS = {'positive': 0.15, 'negative': -0.15}
+# Provider (Alpha Vantage) scores are rescaled onto the VADER compound scale before they stand in for it:
+# piecewise-linear between these knots, which send the provider's band edges (bearish <= -0.35 <
+# somewhat bearish <= -0.15 < neutral < 0.15 <= somewhat bullish < 0.35 <= bullish) to the dashboard's
+# label thresholds and to +-0.5, where VADER's strongly polar range begins
+PROVIDER_SCORE_SCALE = {
+    'provider': [-1.0, -0.35, -0.15, 0.15, 0.35, 1.0],
+    'compound': [-1.0, -0.5, -0.15, 0.15, 0.5, 1.0]
+}
+
+# Real-time sentiment index
+SENTIMENT_INDEX_HALF_LIFE = timedelta(hours=6)           # Weight of an article halves every half-life
+SENTIMENT_INDEX_CHECKPOINT_EVERY = timedelta(minutes=15)  # Resolution of historical index queries
+SENTIMENT_SOURCE_WEIGHTS = {}                             # e.g. {'Reuters': 2.0}; unlisted sources weigh 1.0
+
+# Streaming spike / anomaly detection
+ANOMALY_CONFIG = {
+    'alerts_path': os.path.join(BASE_DIR, 'data', 'alerts.jsonl'),
+    'bucket': timedelta(minutes=5),  # Volume is counted per bucket
+    'alpha': 0.05,                   # EWMA smoothing of the rolling baselines
+    'z_threshold': 3.0,
+    'cusum_drift': 0.5,              # CUSUM slack, in standard deviations
+    'cusum_threshold': 5.0,          # CUSUM alarm level, in standard deviations
+    'warmup': 20,                    # Observations before a baseline may alert
+    'max_tickers': 10000             # Least recently seen tickers are evicted beyond this
+}
+
+# Nightly static reports rendered by reports.py
+REPORT_CONFIG = {
+    'output_dir': os.path.join(BASE_DIR, 'data', 'reports'),
+    'formats': ['html'],   # 'html' and/or 'png'; PNG needs the kaleido package
+    'days': TIME_WINDOW.days,
+    'workers': None,       # Render processes; None uses every core
+    'width': 1200,         # PNG size in pixels
+    'height': 1200
+}
+
 
 class Config:
     BASE_DIR = Path(__file__).resolve().parent.parent
     API_KEYS = API_KEYS  # Reuse the same dictionary
     DATABASE_CONFIG = DATABASE_CONFIG
+    BODY_STORAGE_CONFIG = BODY_STORAGE_CONFIG
+    FILE_STORAGE_CONFIG = FILE_STORAGE_CONFIG
+    ANALYTICS_BACKEND = ANALYTICS_BACKEND
+    DUCKDB_CONFIG = DUCKDB_CONFIG
     MAX_TICKERS_PER_REQUEST = 5
     DATA_STORAGE_DAYS = 30
     CACHE_TTL = 3600
+    DASHBOARD_CACHE_TTL = DASHBOARD_CACHE_TTL
     DEFAULT_TICKERS = ['IBM','AAPL', 'MSFT', 'GOOG']
     TIME_WINDOW = timedelta(days=7)
+    SENTIMENT_MODELS = SENTIMENT_MODELS
+    SENTIMENT_THRESHOLDS = SENTIMENT_THRESHOLDS
+    PROVIDER_SCORE_SCALE = PROVIDER_SCORE_SCALE
+    SENTIMENT_INDEX_HALF_LIFE = SENTIMENT_INDEX_HALF_LIFE
+    SENTIMENT_INDEX_CHECKPOINT_EVERY = SENTIMENT_INDEX_CHECKPOINT_EVERY
+    SENTIMENT_SOURCE_WEIGHTS = SENTIMENT_SOURCE_WEIGHTS
+    ANOMALY_CONFIG = ANOMALY_CONFIG
+    REPORT_CONFIG = REPORT_CONFIG
 
     TOPICS = {
             'Technology': ['IBM','AAPL', 'MSFT', 'GOOG', 'AMZN', 'META'],
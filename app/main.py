@@ -5,6 +5,8 @@ from fetchers.multi_source import MultiSourceFetcher
 from processors.sentiment import SentimentAnalyzer
 from processors.cleaner import DataCleaner
 from storage.database import DatabaseStorage
+from analyzers.anomaly_detector import AnomalyDetector
+from processors.ticker_sentiment import normalize_ticker_sentiment
 
 class FinancialNewsAggregator:
     def __init__(self):
@@ -12,6 +14,8 @@ class FinancialNewsAggregator:
         self.sentiment_analyzer = SentimentAnalyzer()
         self.data_cleaner = DataCleaner()
         self.storage = DatabaseStorage()
+        self.sentiment_index = self.storage.sentiment_index
+        self.anomaly_detector = AnomalyDetector(pool=self.storage.pool)
     
     def fetch_and_store_news(self, tickers, days_back=7):
         """Main method to fetch, process and store news"""
@@ -36,10 +40,22 @@ class FinancialNewsAggregator:
         analyzed_data = self.sentiment_analyzer.analyze_dataframe(cleaned_data)
         
         # Store data
-        self.storage.save_data(analyzed_data)
+        new_data = self.storage.save_data(analyzed_data)
         
-        # Cleanup old data
-        self.storage.cleanup_old_data(settings.DATA_STORAGE_DAYS)
+        # Provider per-ticker scores override the article-wide score where available
+        ticker_sentiment = normalize_ticker_sentiment(new_data)
+        
+        # Update the real-time sentiment index with articles seen for the first time
+        self.sentiment_index.update_batch(new_data, score_col='sentiment_score', ticker_sentiment=ticker_sentiment)
+        
+        # Flag volume and sentiment spikes against each ticker's rolling baseline
+        alerts = self.anomaly_detector.observe_batch(new_data, score_col='sentiment_score',
+                                                     ticker_sentiment=ticker_sentiment)
+        if alerts:
+            print(f"Raised {len(alerts)} sentiment alerts")
+        
+        # Cleanup old data off the ingest path
+        self.storage.cleanup_in_background(settings.DATA_STORAGE_DAYS)
         
         print(f"Successfully stored {len(analyzed_data)} items")
     
@@ -48,6 +64,10 @@ class FinancialNewsAggregator:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days_back)
         return self.storage.load_data(tickers, start_date, end_date)
+    
+    def get_sentiment_index(self, tickers=None, at=None):
+        """Current (or historical) time-decayed sentiment per ticker"""
+        return self.sentiment_index.snapshot(at=at, tickers=tickers)
 
 if __name__ == "__main__":
     aggregator = FinancialNewsAggregator()
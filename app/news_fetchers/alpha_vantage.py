@@ -2,6 +2,7 @@ import requests
 import pandas as pd
 from datetime import datetime
 from config import settings
+from processors.ticker_sentiment import provider_to_compound
 from .base_fetcher import BaseNewsFetcher
 from datetime import datetime, timedelta
 
@@ -56,7 +57,8 @@ class AlphaVantageFetcher(BaseNewsFetcher):
                     'source_name': item.get('source', ''),
                     'published': published_date,
                     'tickers': [t['ticker'] for t in item.get('ticker_sentiment', [])],
-                    'sentiment_score': float(item.get('overall_sentiment_score', 0)),
+                    'ticker_sentiment': item.get('ticker_sentiment', []),  # Per-ticker relevance and sentiment
+                    'provider_score': float(item.get('overall_sentiment_score', 0)),
                     'type': 'news'
                 }
                 articles.append(article)
@@ -64,4 +66,8 @@ class AlphaVantageFetcher(BaseNewsFetcher):
                 print(f"Error parsing AlphaVantage article: {str(e)}")
                 continue
                 
-        return self._to_dataframe(self._filter_by_date(articles, start_date, end_date))
\ No newline at end of file
+        df = self._to_dataframe(self._filter_by_date(articles, start_date, end_date))
+        if not df.empty:
+            # Stored on the compound scale, like the scores of every other ingest path
+            df['sentiment_score'] = provider_to_compound(df['provider_score'])
+        return df
\ No newline at end of file
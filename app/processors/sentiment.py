@@ -1,4 +1,3 @@
-from textblob import TextBlob
 import pandas as pd
 
 class SentimentAnalyzer:
@@ -7,6 +6,8 @@ class SentimentAnalyzer:
     
     def analyze_sentiment(self, text):
         """Analyze sentiment of text using TextBlob"""
+        # Imported lazily so TextBlob/pattern only load when this analyzer is used
+        from textblob import TextBlob
         analysis = TextBlob(text)
         return analysis.sentiment.polarity
     
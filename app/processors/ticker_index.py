@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from processors.ticker_sentiment import parse_tickers
+
+
+class TickerIndex:
+    """Compressed sparse row index of the tickers each article mentions.
+
+    Tickers are numbered 0..n_tickers-1 in sorted order. The codes of the
+    tickers of article ``i`` are ``codes[offsets[i]:offsets[i + 1]]`` and
+    ``rows`` holds the article of every code, so per-ticker counts, means
+    and filters are bincount / isin calls over flat integer arrays instead
+    of exploding the list column. Build it once per version of the data
+    and share it between every view of that version.
+    """
+
+    def __init__(self, tickers, codes, offsets):
+        self.tickers = tickers
+        self.codes = codes
+        self.offsets = offsets
+        self.rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    @classmethod
+    def from_arrow(cls, column):
+        """Index a list<string> Arrow column, reusing its offsets; no Python per article"""
+        if isinstance(column, pa.ChunkedArray):
+            column = column.combine_chunks() if column.num_chunks else pa.array([], column.type)
+        lengths = pc.fill_null(pc.list_value_length(column), 0).to_numpy(zero_copy_only=False)
+        encoded = pc.list_flatten(column).dictionary_encode()
+        return cls._build(
+            encoded.dictionary.to_numpy(zero_copy_only=False).astype(object),
+            pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False),
+            lengths
+        )
+
+    @classmethod
+    def from_series(cls, tickers):
+        """Index a column of ticker lists or comma-joined strings"""
+        parsed = [parse_tickers(value) for value in tickers]
+        lengths = np.fromiter((len(value) for value in parsed), dtype=np.int64, count=len(parsed))
+        flat = [ticker for value in parsed for ticker in value]
+        codes, symbols = pd.factorize(pd.Series(flat, dtype=object))
+        return cls._build(np.asarray(symbols, dtype=object), codes, lengths)
+
+    @classmethod
+    def _build(cls, symbols, codes, lengths):
+        # Drop empty symbols and renumber the rest in sorted order; -1 (missing) stays -1
+        keep = np.array([bool(symbol) for symbol in symbols], dtype=bool)
+        order = np.argsort(symbols[keep], kind='stable')
+        renumber = np.full(len(symbols) + 1, -1, dtype=np.int64)
+        renumber[np.flatnonzero(keep)[order]] = np.arange(len(order))
+        codes = renumber[np.asarray(codes, dtype=np.int64)]
+
+        # An article listing a ticker twice still mentions it once
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        known = codes >= 0
+        width = max(len(order), 1)
+        pairs = np.sort(rows[known] * width + codes[known])
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        rows, codes = np.divmod(pairs, width)
+        offsets = np.searchsorted(rows, np.arange(len(lengths) + 1)).astype(np.int64)
+        return cls(symbols[keep][order], codes.astype(np.int32), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def n_tickers(self):
+        return len(self.tickers)
+
+    def lookup(self, tickers):
+        """Codes of the given tickers; unknown tickers are left out"""
+        tickers = np.asarray(list(tickers), dtype=object)
+        positions = np.searchsorted(self.tickers, tickers)
+        found = positions < len(self.tickers)
+        found[found] = self.tickers[positions[found]] == tickers[found]
+        return positions[found]
+
+    def counts(self):
+        """Articles per ticker"""
+        return pd.Series(
+            np.bincount(self.codes, minlength=self.n_tickers), index=pd.Index(self.tickers, name='ticker')
+        )
+
+    def aggregate(self, values, where=None):
+        """Count and mean of a per-article value for every ticker.
+
+        ``values`` is aligned with the articles; missing values are left
+        out of the mean but still counted. ``where`` is a boolean mask of
+        the articles that take part. Tickers without articles are left out.
+        """
+        values = np.asarray(values, dtype=float)[self.rows]
+        weights = np.ones(len(self.rows)) if where is None else np.asarray(where, dtype=float)[self.rows]
+        scored = ~np.isnan(values) & (weights > 0)
+        count = np.bincount(self.codes, weights=weights, minlength=self.n_tickers)
+        scored_count = np.bincount(self.codes[scored], minlength=self.n_tickers)
+        total = np.bincount(self.codes[scored], weights=values[scored], minlength=self.n_tickers)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / scored_count
+        present = count > 0
+        return pd.DataFrame({
+            'ticker': self.tickers[present],
+            'count': count[present].astype(int),
+            'mean': mean[present]
+        })
+
+    def mask(self, tickers):
+        """Boolean mask of the articles mentioning any of ``tickers``"""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.rows[np.isin(self.codes, self.lookup(tickers))]] = True
+        return mask
+
+    def explode(self, df, columns=None):
+        """One row per (article, ticker) of ``df``, taken by position, with a ``ticker`` column"""
+        exploded = (df if columns is None else df[columns]).iloc[self.rows].reset_index(drop=True)
+        exploded['ticker'] = self.tickers[self.codes]
+        return exploded
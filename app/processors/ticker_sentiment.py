@@ -0,0 +1,95 @@
+import ast
+import numpy as np
+import pandas as pd
+from config import settings
+
+TICKER_SENTIMENT_COLUMNS = ['url', 'ticker', 'relevance_score', 'ticker_sentiment_score', 'ticker_sentiment_label']
+
+
+def normalize_ticker_sentiment(df, key='url', column='ticker_sentiment'):
+    """Flatten provider per-ticker sentiment into one row per (article, ticker).
+
+    Alpha Vantage attaches a ``ticker_sentiment`` list to every article with the
+    relevance and sentiment of each ticker it mentions.
+    """
+    if df.empty or column not in df.columns:
+        return pd.DataFrame(columns=TICKER_SENTIMENT_COLUMNS)
+
+    rows = []
+    for article_key, items in zip(df[key].astype(str), df[column]):
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if not isinstance(item, dict) or not item.get('ticker'):
+                continue
+            rows.append({
+                'url': article_key,
+                'ticker': item['ticker'],
+                'relevance_score': pd.to_numeric(item.get('relevance_score'), errors='coerce'),
+                'ticker_sentiment_score': pd.to_numeric(item.get('ticker_sentiment_score'), errors='coerce'),
+                'ticker_sentiment_label': item.get('ticker_sentiment_label', '')
+            })
+
+    result = pd.DataFrame(rows, columns=TICKER_SENTIMENT_COLUMNS)
+    return result.drop_duplicates(subset=['url', 'ticker'], keep='last')
+
+
+def provider_to_compound(scores):
+    """Provider sentiment rescaled onto the VADER compound scale with PROVIDER_SCORE_SCALE.
+
+    The raw provider score is kept in its own column; this is only for
+    where it stands in for a locally computed compound score. Missing
+    scores stay missing.
+    """
+    scale = settings.PROVIDER_SCORE_SCALE
+    scores = pd.to_numeric(pd.Series(scores), errors='coerce')
+    return pd.Series(np.interp(scores, scale['provider'], scale['compound']), index=scores.index)
+
+
+def explode_ticker_scores(articles, ticker_sentiment=None, score_col='compound', key='url'):
+    """One row per (article, ticker), scored with the provider's ticker-specific
+    sentiment where available, rescaled by provider_to_compound, and the
+    article-wide score otherwise"""
+    columns = ['url', 'ticker', 'source', 'published', 'title', 'score', 'relevance_score', 'score_origin']
+    if articles.empty or score_col not in articles.columns:
+        return pd.DataFrame(columns=columns)
+
+    exploded = pd.DataFrame({
+        'url': articles[key].astype(str) if key in articles.columns else articles.index.astype(str),
+        'ticker': articles['tickers'].apply(parse_tickers),
+        'source': articles['source'] if 'source' in articles.columns else None,
+        'published': articles['published'],
+        'title': articles['title'] if 'title' in articles.columns else None,
+        'score': pd.to_numeric(articles[score_col], errors='coerce')
+    }).explode('ticker')
+    exploded = exploded[exploded['ticker'].notna()]
+
+    if ticker_sentiment is not None and not ticker_sentiment.empty:
+        provider = ticker_sentiment[['url', 'ticker', 'relevance_score', 'ticker_sentiment_score']]
+        exploded = exploded.merge(provider, on=['url', 'ticker'], how='left')
+        has_provider = exploded['ticker_sentiment_score'].notna()
+        exploded['score'] = provider_to_compound(exploded['ticker_sentiment_score']).where(
+            has_provider, exploded['score'])
+        exploded['score_origin'] = has_provider.map({True: 'provider', False: 'local'})
+        exploded = exploded.drop(columns='ticker_sentiment_score')
+    else:
+        exploded['relevance_score'] = float('nan')
+        exploded['score_origin'] = 'local'
+
+    return exploded[columns].reset_index(drop=True)
+
+
+def parse_tickers(value):
+    """Normalize a tickers cell: a list or tuple, its CSV string repr or a comma-joined string"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, tuple):
+        return list(value)
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            return list(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            return []
+    if isinstance(value, str) and value:
+        return value.split(',')
+    return []
@@ -0,0 +1,261 @@
+import argparse
+import importlib.util
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+from plotly.subplots import make_subplots
+from config import settings
+from storage.aggregates import ALL_TICKERS
+from storage.database import DatabaseStorage
+
+REPORT_FORMATS = ('html', 'png')
+
+SENTIMENT_COLORS = {
+    'positive': '#2ecc71',
+    'neutral': '#f1c40f',
+    'negative': '#e74c3c'
+}
+
+# Rollup rows of the current run, and the article-level rows of each sector report;
+# each worker process is handed them once, when it starts
+_rollups = None
+_sector_rollups = None
+
+
+def report_specs(topics=None, tickers=None):
+    """The reports of a run: the whole market, every sector and every major ticker.
+
+    Major tickers default to every ticker of a sector plus the default
+    tickers. ``tickers`` of None in a spec means all of them.
+    """
+    topics = settings.Config.TOPICS if topics is None else topics
+    if tickers is None:
+        tickers = sorted({ticker for members in topics.values() for ticker in members} | set(settings.DEFAULT_TICKERS))
+    specs = [{'name': 'market', 'kind': 'market', 'title': 'Market', 'tickers': None}]
+    specs += [
+        {'name': f"sector-{_slug(sector)}", 'kind': 'sector', 'title': sector, 'tickers': list(members)}
+        for sector, members in topics.items()
+    ]
+    specs += [
+        {'name': f"ticker-{_slug(ticker)}", 'kind': 'ticker', 'title': ticker, 'tickers': [ticker]}
+        for ticker in tickers
+    ]
+    return specs
+
+
+def render_reports(output_dir=None, days=None, formats=None, workers=None, specs=None):
+    """Render every report into ``output_dir`` and write its manifest.json.
+
+    The rollups, and the article-level rows of every sector, are read once
+    and handed to a pool of worker processes,
+    one per core by default, which slice and render the reports in
+    parallel; wall time is set by reports per core, not by the number of
+    reports. A report that fails is recorded in the manifest with its
+    error instead of stopping the run. Returns the manifest.
+    """
+    config = settings.REPORT_CONFIG
+    output_dir = output_dir or config['output_dir']
+    formats = list(dict.fromkeys(formats or config['formats']))
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown report formats: {sorted(unknown)}")
+    if 'png' in formats and importlib.util.find_spec('kaleido') is None:
+        print("PNG reports need the kaleido package; writing the other formats only")
+        formats.remove('png')
+    specs = report_specs() if specs is None else specs
+
+    end_day = date.today()
+    start_day = end_day - timedelta(days=(days or config['days']) - 1)
+    # The only database access of the run; workers never open the database
+    db = DatabaseStorage()
+    try:
+        rollups = db.rollups.read(start_day=start_day, end_day=end_day)
+        # An article mentioning several of a sector's tickers counts once in the sector
+        sector_rollups = {
+            spec['name']: db.article_rollups(spec['tickers'], start_day=start_day, end_day=end_day)
+            for spec in specs if spec['kind'] == 'sector'
+        }
+    finally:
+        db.close()
+
+    os.makedirs(output_dir, exist_ok=True)
+    if 'html' in formats:
+        # Written once and referenced by every report instead of being inlined into each
+        with open(os.path.join(output_dir, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    if not rollups.empty:
+        # Plotly loads its figure machinery lazily on first use; loading it here means
+        # forked workers inherit it instead of each paying for it on their first report
+        create_report_figure(rollups, rollups, '').to_html(include_plotlyjs=False)
+
+    workers = max(1, min(workers or config['workers'] or os.cpu_count(), len(specs)))
+    window = (start_day.isoformat(), end_day.isoformat())
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(rollups, sector_rollups)) as executor:
+        futures = [executor.submit(_render_report, spec, output_dir, formats, window) for spec in specs]
+        reports = [future.result() for future in futures]
+
+    manifest = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'start_day': window[0],
+        'end_day': window[1],
+        'formats': formats,
+        'workers': workers,
+        'seconds': round(time.perf_counter() - started, 3),
+        'reports': reports
+    }
+    _write_json(os.path.join(output_dir, 'manifest.json'), manifest)
+    return manifest
+
+
+def create_report_figure(rows, per_ticker, title):
+    """Composite report figure laid out like Dashboard.create_dashboard, drawn from rollup rows.
+
+    ``rows`` drive the gauge, source mix and timeline; ``per_ticker`` holds
+    the per-ticker rows ranked in the bar chart, which falls back to
+    ranking sources when the report covers a single ticker.
+    """
+    by = 'ticker' if per_ticker['ticker'].nunique() > 1 else 'source'
+    fig = make_subplots(
+        rows=3, cols=2,
+        specs=[
+            [{'type': 'indicator'}, {'type': 'pie'}],
+            [{'type': 'bar', 'colspan': 2}, None],
+            [{'type': 'scatter', 'colspan': 2}, None]
+        ],
+        subplot_titles=(
+            'Average Sentiment', 'News Sources',
+            f'Top {by.title()}s by Sentiment', 'Sentiment Timeline'
+        )
+    )
+
+    fig.add_trace(go.Indicator(
+        mode="gauge+number",
+        value=_mean(rows),
+        gauge={
+            'axis': {'range': [-1, 1]},
+            'steps': [
+                {'range': [-1, -0.5], 'color': SENTIMENT_COLORS['negative']},
+                {'range': [-0.5, 0], 'color': SENTIMENT_COLORS['neutral']},
+                {'range': [0, 0.5], 'color': SENTIMENT_COLORS['positive']},
+                {'range': [0.5, 1], 'color': '#27ae60'}
+            ]
+        }
+    ), row=1, col=1)
+
+    sources = rows.groupby('source')['count'].sum().nlargest(10)
+    fig.add_trace(go.Pie(labels=sources.index, values=sources.values, hole=0.4), row=1, col=2)
+
+    ranked = _means(per_ticker if by == 'ticker' else rows, by).nlargest(10, 'mean')
+    fig.add_trace(go.Bar(
+        x=ranked['mean'],
+        y=ranked[by],
+        orientation='h',
+        marker_color=SENTIMENT_COLORS['positive']
+    ), row=2, col=1)
+
+    timeline = _means(rows, 'day')
+    fig.add_trace(go.Scatter(
+        x=timeline['day'],
+        y=timeline['mean'],
+        mode='lines+markers',
+        line_color=SENTIMENT_COLORS['neutral']
+    ), row=3, col=1)
+
+    fig.update_layout(
+        title=title,
+        height=1200,
+        template='plotly_dark',
+        margin=dict(t=100, b=50),
+        showlegend=False
+    )
+    return fig
+
+
+def _init_worker(rollups, sector_rollups):
+    global _rollups, _sector_rollups
+    _rollups = rollups
+    _sector_rollups = sector_rollups
+
+
+def _render_report(spec, output_dir, formats, window):
+    """Render one report from the worker's rollups; returns its manifest entry"""
+    started = time.perf_counter()
+    entry = dict(spec, status='ok', files={})
+    try:
+        # Totals come from article-level rows, so an article mentioning several tickers counts once;
+        # per-ticker rows only feed the per-ticker breakdown
+        per_ticker = _rollups[_rollups['ticker'] != ALL_TICKERS]
+        if spec['tickers'] is None:
+            rows = _rollups[_rollups['ticker'] == ALL_TICKERS]
+        else:
+            per_ticker = per_ticker[per_ticker['ticker'].isin(spec['tickers'])]
+            rows = _sector_rollups[spec['name']] if spec['kind'] == 'sector' else per_ticker
+        entry['count'] = int(rows['count'].sum())
+        if rows.empty:
+            entry['status'] = 'empty'
+        else:
+            entry['mean'] = round(_mean(rows), 4)
+            fig = create_report_figure(rows, per_ticker, f"{spec['title']} sentiment, {window[0]} to {window[1]}")
+            for fmt in formats:
+                filename = f"{spec['name']}.{fmt}"
+                path = os.path.join(output_dir, filename)
+                if fmt == 'html':
+                    fig.write_html(path, include_plotlyjs='directory')
+                else:
+                    config = settings.REPORT_CONFIG
+                    fig.write_image(path, width=config['width'], height=config['height'])
+                entry['files'][fmt] = filename
+    except Exception as e:
+        entry['status'] = 'error'
+        entry['error'] = str(e)
+    entry['seconds'] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def _mean(rows):
+    return float(rows['total'].sum() / rows['count'].sum())
+
+
+def _means(rows, by):
+    """Article count and mean score per value of ``by`` from summed rollups"""
+    grouped = rows.groupby(by, as_index=False)[['count', 'total']].sum()
+    grouped['mean'] = grouped['total'] / grouped['count']
+    return grouped
+
+
+def _slug(value):
+    return re.sub(r'[^a-z0-9]+', '-', str(value).lower()).strip('-')
+
+
+def _write_json(path, data):
+    """Write atomically, so readers never see a half-written manifest"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render static sentiment reports for every sector and major ticker")
+    parser.add_argument('--output', help="Directory for the reports and manifest.json")
+    parser.add_argument('--days', type=int, help="Days of rollups each report covers")
+    parser.add_argument('--format', dest='formats', action='append', choices=REPORT_FORMATS,
+                        help="Output format; repeat for several")
+    parser.add_argument('--workers', type=int, help="Render processes; defaults to one per core")
+    args = parser.parse_args()
+
+    manifest = render_reports(args.output, args.days, args.formats, args.workers)
+    failed = [report for report in manifest['reports'] if report['status'] == 'error']
+    print(f"Rendered {len(manifest['reports']) - len(failed)} reports in {manifest['seconds']}s "
+          f"with {manifest['workers']} workers")
+    for report in failed:
+        print(f"{report['name']} failed: {report['error']}")
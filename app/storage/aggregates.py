@@ -0,0 +1,351 @@
+import numpy as np
+import pandas as pd
+from config import settings
+from processors.ticker_sentiment import explode_ticker_scores
+
+# Ticker value of the article-level rollup rows, which count every article once
+ALL_TICKERS = ''
+
+
+class SentimentAggregateStore:
+    """Per-ticker sentiment statistics maintained incrementally as batches are written.
+
+    Counts, sums, sums of squares and min/max are kept per (ticker, source, day)
+    and as all-time totals per ticker, so means and variances are read from a
+    handful of pre-aggregated rows instead of re-scanning every article.
+    """
+
+    def __init__(self, pool, prefix='ticker_sentiment'):
+        self.pool = pool
+        self.daily_table = f"{prefix}_daily"
+        self.totals_table = f"{prefix}_totals"
+        self._initialize_tables()
+
+    def _initialize_tables(self):
+        """Create the aggregate tables if they don't exist"""
+        with self.pool.writer() as conn:
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.daily_table} (
+                ticker TEXT NOT NULL,
+                source TEXT NOT NULL,
+                day TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                total REAL NOT NULL,
+                total_sq REAL NOT NULL,
+                min_score REAL NOT NULL,
+                max_score REAL NOT NULL,
+                PRIMARY KEY (ticker, source, day)
+            )
+            """)
+            conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{self.daily_table}_day
+            ON {self.daily_table} (day, ticker)
+            """)
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.totals_table} (
+                ticker TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                total REAL NOT NULL,
+                total_sq REAL NOT NULL,
+                min_score REAL NOT NULL,
+                max_score REAL NOT NULL
+            )
+            """)
+
+    def is_empty(self):
+        with self.pool.reader() as conn:
+            return conn.execute(f"SELECT 1 FROM {self.totals_table} LIMIT 1").fetchone() is None
+
+    def update(self, df, score_col='compound', ticker_sentiment=None, conn=None):
+        """Fold a batch of newly written articles into the aggregates.
+
+        Only rows that were actually inserted should be passed in, otherwise
+        duplicates are counted twice. Provider per-ticker scores in
+        ``ticker_sentiment`` take precedence over the article-wide score.
+        Pass the writer ``conn`` to join the caller's transaction; otherwise
+        the update is a transaction of its own.
+        """
+        if conn is None:
+            with self.pool.writer() as conn:
+                return self.update(df, score_col, ticker_sentiment, conn)
+        if df.empty or score_col not in df.columns:
+            return
+
+        scores = explode_ticker_scores(df, ticker_sentiment, score_col=score_col)
+        batch = pd.DataFrame({
+            'ticker': scores['ticker'],
+            'source': scores['source'].fillna('Unknown').astype(str),
+            'day': pd.to_datetime(scores['published'], utc=True, errors='coerce').dt.strftime('%Y-%m-%d'),
+            'score': scores['score']
+        })
+        batch = batch.dropna(subset=['ticker', 'day', 'score'])
+        if batch.empty:
+            return
+        batch['score_sq'] = batch['score'] ** 2
+
+        daily = batch.groupby(['ticker', 'source', 'day']).agg(
+            count=('score', 'size'),
+            total=('score', 'sum'),
+            total_sq=('score_sq', 'sum'),
+            min_score=('score', 'min'),
+            max_score=('score', 'max')
+        ).reset_index()
+        totals = daily.groupby('ticker').agg(
+            count=('count', 'sum'),
+            total=('total', 'sum'),
+            total_sq=('total_sq', 'sum'),
+            min_score=('min_score', 'min'),
+            max_score=('max_score', 'max')
+        ).reset_index()
+
+        merge = """
+            count = count + excluded.count,
+            total = total + excluded.total,
+            total_sq = total_sq + excluded.total_sq,
+            min_score = MIN(min_score, excluded.min_score),
+            max_score = MAX(max_score, excluded.max_score)
+        """
+        conn.executemany(f"""
+        INSERT INTO {self.daily_table}
+        (ticker, source, day, count, total, total_sq, min_score, max_score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (ticker, source, day) DO UPDATE SET {merge}
+        """, daily.itertuples(index=False, name=None))
+        conn.executemany(f"""
+        INSERT INTO {self.totals_table}
+        (ticker, count, total, total_sq, min_score, max_score)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (ticker) DO UPDATE SET {merge}
+        """, totals.itertuples(index=False, name=None))
+
+    def rebuild(self, df, score_col='compound', ticker_sentiment=None):
+        """Recompute the aggregates from scratch, e.g. for data stored before they existed"""
+        with self.pool.writer() as conn:
+            conn.execute(f"DELETE FROM {self.daily_table}")
+            conn.execute(f"DELETE FROM {self.totals_table}")
+            self.update(df, score_col=score_col, ticker_sentiment=ticker_sentiment, conn=conn)
+
+    def all_time(self, tickers=None):
+        """All-time count, mean, variance and min/max per ticker"""
+        query = f"SELECT ticker, count, total, total_sq, min_score, max_score FROM {self.totals_table}"
+        params = []
+        if tickers:
+            query += f" WHERE ticker IN ({','.join('?' * len(tickers))})"
+            params.extend(tickers)
+        with self.pool.reader() as conn:
+            return _finalize(pd.read_sql_query(query, conn, params=params or None), ['ticker'])
+
+    def delete_before(self, day, conn=None, limit=-1):
+        """Drop the daily rows of days before ``day``, at most ``limit`` of them; returns how many went.
+
+        All-time totals are kept; they already include the deleted days.
+        """
+        if conn is None:
+            with self.pool.writer() as conn:
+                return self.delete_before(day, conn, limit)
+        return conn.execute(f"""
+        DELETE FROM {self.daily_table} WHERE rowid IN (
+            SELECT rowid FROM {self.daily_table} WHERE day < ? LIMIT ?
+        )
+        """, (pd.Timestamp(day).strftime('%Y-%m-%d'), limit)).rowcount
+
+    def stats(self, by=('ticker',), tickers=None, sources=None, start_day=None, end_day=None):
+        """Window statistics grouped by any of ticker, source and day"""
+        by = list(by)
+        if not set(by) <= {'ticker', 'source', 'day'}:
+            raise ValueError(f"Unsupported grouping: {by}")
+
+        conditions = []
+        params = []
+        if tickers:
+            conditions.append(f"ticker IN ({','.join('?' * len(tickers))})")
+            params.extend(tickers)
+        if sources:
+            conditions.append(f"source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if start_day:
+            conditions.append("day >= ?")
+            params.append(pd.Timestamp(start_day).strftime('%Y-%m-%d'))
+        if end_day:
+            conditions.append("day <= ?")
+            params.append(pd.Timestamp(end_day).strftime('%Y-%m-%d'))
+
+        group_cols = ', '.join(by)
+        query = f"""
+        SELECT {group_cols}, SUM(count) AS count, SUM(total) AS total, SUM(total_sq) AS total_sq,
+               MIN(min_score) AS min_score, MAX(max_score) AS max_score
+        FROM {self.daily_table}
+        """
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" GROUP BY {group_cols}"
+
+        with self.pool.reader() as conn:
+            return _finalize(pd.read_sql_query(query, conn, params=params or None), by)
+
+
+class DailyRollupStore:
+    """Article counts and score sums per (day, ticker, source, sentiment label).
+
+    Maintained on every write so dashboard charts are computed from
+    days x tickers pre-aggregated rows rather than from raw articles. Rows
+    with ``ticker = ALL_TICKERS`` are at article level, so totals per day or
+    source don't count an article once per ticker it mentions.
+    """
+
+    def __init__(self, pool, table_name='daily_rollups'):
+        self.pool = pool
+        self.table_name = table_name
+        self._initialize_table()
+
+    def _initialize_table(self):
+        """Create the rollup table if it doesn't exist"""
+        with self.pool.writer() as conn:
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                day TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                source TEXT NOT NULL,
+                label TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                total REAL NOT NULL,
+                PRIMARY KEY (day, ticker, source, label)
+            ) WITHOUT ROWID
+            """)
+
+    def update(self, df, score_col='compound', ticker_sentiment=None, conn=None):
+        """Fold a batch of newly written articles into the rollups.
+
+        As with SentimentAggregateStore.update, only rows that were actually
+        inserted should be passed in, and ``conn`` joins the caller's write
+        transaction.
+        """
+        if conn is None:
+            with self.pool.writer() as conn:
+                return self.update(df, score_col, ticker_sentiment, conn)
+        if df.empty or score_col not in df.columns:
+            return
+
+        articles = pd.DataFrame({
+            'ticker': ALL_TICKERS,
+            'source': df['source'],
+            'published': df['published'],
+            'score': pd.to_numeric(df[score_col], errors='coerce')
+        })
+        per_ticker = explode_ticker_scores(df, ticker_sentiment, score_col=score_col)
+        rollup = rollup_rows(pd.concat([articles, per_ticker[['ticker', 'source', 'published', 'score']]],
+                                       ignore_index=True))
+        if rollup.empty:
+            return
+        conn.executemany(f"""
+        INSERT INTO {self.table_name} (day, ticker, source, label, count, total)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (day, ticker, source, label) DO UPDATE SET
+            count = count + excluded.count,
+            total = total + excluded.total
+        """, rollup.itertuples(index=False, name=None))
+
+    def query(self, by=('day',), per_ticker=False, tickers=None, sources=None, start_day=None, end_day=None):
+        """Article counts and mean score grouped by any of day, ticker, source and label.
+
+        Counts are per article unless ``per_ticker`` is set or ``by`` includes
+        ``ticker``, in which case they are per (article, ticker) mention.
+        """
+        by = list(by)
+        if not set(by) <= {'day', 'ticker', 'source', 'label'}:
+            raise ValueError(f"Unsupported grouping: {by}")
+
+        conditions = ["ticker != ?" if per_ticker or 'ticker' in by or tickers else "ticker = ?"]
+        params = [ALL_TICKERS]
+        if tickers:
+            conditions.append(f"ticker IN ({','.join('?' * len(tickers))})")
+            params.extend(tickers)
+        if sources:
+            conditions.append(f"source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if start_day:
+            conditions.append("day >= ?")
+            params.append(pd.Timestamp(start_day).strftime('%Y-%m-%d'))
+        if end_day:
+            conditions.append("day <= ?")
+            params.append(pd.Timestamp(end_day).strftime('%Y-%m-%d'))
+
+        group_cols = ', '.join(by)
+        with self.pool.reader() as conn:
+            df = pd.read_sql_query(f"""
+            SELECT {group_cols}, SUM(count) AS count, SUM(total) / SUM(count) AS mean
+            FROM {self.table_name}
+            WHERE {' AND '.join(conditions)}
+            GROUP BY {group_cols}
+            ORDER BY {group_cols}
+            """, conn, params=params)
+        if 'day' in by:
+            df['day'] = pd.to_datetime(df['day']).dt.date
+        return df
+
+    def read(self, start_day=None, end_day=None):
+        """The rollup rows themselves, article-level ``ALL_TICKERS`` rows included.
+
+        For batch jobs that slice the same rollups many ways: one read, then
+        every grouping in memory.
+        """
+        conditions = []
+        params = []
+        if start_day:
+            conditions.append("day >= ?")
+            params.append(pd.Timestamp(start_day).strftime('%Y-%m-%d'))
+        if end_day:
+            conditions.append("day <= ?")
+            params.append(pd.Timestamp(end_day).strftime('%Y-%m-%d'))
+        query = f"SELECT day, ticker, source, label, count, total FROM {self.table_name}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self.pool.reader() as conn:
+            df = pd.read_sql_query(query, conn, params=params or None)
+        df['day'] = pd.to_datetime(df['day']).dt.date
+        return df
+
+    def delete_before(self, day, conn=None, limit=-1):
+        """Drop the rollups of days before ``day``, at most ``limit`` rows; returns how many went"""
+        if conn is None:
+            with self.pool.writer() as conn:
+                return self.delete_before(day, conn, limit)
+        return conn.execute(f"""
+        DELETE FROM {self.table_name} WHERE (day, ticker, source, label) IN (
+            SELECT day, ticker, source, label FROM {self.table_name} WHERE day < ? LIMIT ?
+        )
+        """, (pd.Timestamp(day).strftime('%Y-%m-%d'), limit)).rowcount
+
+
+def rollup_rows(batch):
+    """Rollup rows (day, ticker, source, label, count, total) of scored rows with
+    ticker, source, published and score columns"""
+    batch = batch.assign(
+        day=pd.to_datetime(batch['published'], utc=True, errors='coerce').dt.strftime('%Y-%m-%d'),
+        source=batch['source'].fillna('Unknown').astype(str)
+    ).dropna(subset=['day', 'score'])
+    batch['label'] = sentiment_labels(batch['score']) if not batch.empty else []
+    return batch.groupby(['day', 'ticker', 'source', 'label']).agg(
+        count=('score', 'size'),
+        total=('score', 'sum')
+    ).reset_index()
+
+
+def sentiment_labels(scores):
+    """Map scores onto positive / neutral / negative with the configured thresholds"""
+    thresholds = settings.SENTIMENT_THRESHOLDS
+    return np.select(
+        [scores > thresholds['positive'], scores < thresholds['negative']],
+        ['positive', 'negative'],
+        default='neutral'
+    )
+
+
+def _finalize(df, by):
+    """Turn running sums into mean and (population) variance"""
+    if df.empty:
+        return pd.DataFrame(columns=by + ['count', 'mean', 'variance', 'min', 'max'])
+    df['mean'] = df['total'] / df['count']
+    df['variance'] = (df['total_sq'] / df['count'] - df['mean'] ** 2).clip(lower=0)
+    df = df.rename(columns={'min_score': 'min', 'max_score': 'max'})
+    return df[by + ['count', 'mean', 'variance', 'min', 'max']]
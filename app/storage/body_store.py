@@ -0,0 +1,157 @@
+import sqlite3
+import threading
+from contextlib import closing
+import zstandard as zstd
+from config import settings
+
+
+class BodyStore:
+    """Article bodies compressed with zstd, kept out of the narrow articles table.
+
+    Bodies are written once per article and fetched by article id when
+    needed. A dictionary trained on stored bodies lets zstd compress even
+    short summaries well; bodies written before one existed are plain zstd
+    frames with a NULL ``dict_id``. ``register`` adds a ``body_text(dict_id,
+    body)`` SQL function so SQLite itself (full-text index, triggers) can
+    read the text back.
+    """
+
+    def __init__(self, db_path, table_name='article_bodies', dict_table='body_dictionaries'):
+        config = settings.BODY_STORAGE_CONFIG
+        self.db_path = db_path
+        self.table_name = table_name
+        self.dict_table = dict_table
+        self.level = config['level']
+        self.dict_size = config['dict_size']
+        self.train_samples = config['train_samples']
+        self._dictionaries = {}
+        self._active_dict_id = None
+        self._lock = threading.Lock()
+        # zstd (de)compressors aren't thread-safe, so each thread keeps its own
+        self._local = threading.local()
+
+    def initialize(self, conn):
+        """Create the body and dictionary tables and load the dictionaries"""
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.dict_table} (
+            dict_id INTEGER PRIMARY KEY,
+            dictionary BLOB NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.table_name} (
+            article_id INTEGER PRIMARY KEY,
+            dict_id INTEGER,
+            body BLOB NOT NULL
+        )
+        """)
+        for dict_id, data in conn.execute(f"SELECT dict_id, dictionary FROM {self.dict_table} ORDER BY dict_id"):
+            self._dictionaries[dict_id] = zstd.ZstdCompressionDict(data)
+            self._active_dict_id = dict_id
+
+    def register(self, conn):
+        conn.create_function('body_text', 2, self.decompress, deterministic=True)
+
+    def _dictionary(self, dict_id):
+        dictionary = self._dictionaries.get(dict_id)
+        if dictionary is None:
+            # Trained by another process since this one loaded the dictionaries
+            with self._lock, closing(sqlite3.connect(self.db_path)) as conn:
+                row = conn.execute(
+                    f"SELECT dictionary FROM {self.dict_table} WHERE dict_id = ?", (dict_id,)
+                ).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown body dictionary {dict_id}")
+            dictionary = self._dictionaries[dict_id] = zstd.ZstdCompressionDict(row[0])
+        return dictionary
+
+    def _codec(self, kind, dict_id):
+        codecs = getattr(self._local, kind, None)
+        if codecs is None:
+            codecs = {}
+            setattr(self._local, kind, codecs)
+        codec = codecs.get(dict_id)
+        if codec is None:
+            dictionary = self._dictionary(dict_id) if dict_id is not None else None
+            if kind == 'compressors':
+                codec = zstd.ZstdCompressor(level=self.level, dict_data=dictionary)
+            else:
+                codec = zstd.ZstdDecompressor(dict_data=dictionary)
+            codecs[dict_id] = codec
+        return codec
+
+    def decompress(self, dict_id, body):
+        if body is None:
+            return None
+        return self._codec('decompressors', dict_id).decompress(body).decode('utf-8')
+
+    def train(self, conn, texts):
+        """Train a dictionary on sample bodies and make it the one new bodies use.
+
+        Returns False when there isn't enough sample text to train on.
+        """
+        samples = [_text(text).encode('utf-8') for text in texts if _text(text)]
+        if len(samples) < self.train_samples:
+            return False
+        try:
+            dictionary = zstd.train_dictionary(self.dict_size, samples, level=self.level)
+        except zstd.ZstdError as e:
+            print(f"Could not train body dictionary: {str(e)}")
+            return False
+        cursor = conn.execute(f"INSERT INTO {self.dict_table} (dictionary) VALUES (?)", (dictionary.as_bytes(),))
+        self._dictionaries[cursor.lastrowid] = dictionary
+        self._active_dict_id = cursor.lastrowid
+        return True
+
+    def refresh(self, conn):
+        """Adopt the newest dictionary, which another process may have trained since
+        this one loaded them; returns whether there is one"""
+        row = conn.execute(
+            f"SELECT dict_id, dictionary FROM {self.dict_table} ORDER BY dict_id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return False
+        dict_id, data = row
+        if dict_id not in self._dictionaries:
+            self._dictionaries[dict_id] = zstd.ZstdCompressionDict(data)
+        self._active_dict_id = dict_id
+        return True
+
+    @property
+    def needs_dictionary(self):
+        return self._active_dict_id is None
+
+    def put(self, conn, article_ids, texts):
+        """Compress and store the bodies of newly written articles"""
+        texts = [_text(text) for text in texts]
+        dict_id = self._active_dict_id
+        compressor = self._codec('compressors', dict_id)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table_name} (article_id, dict_id, body) VALUES (?, ?, ?)",
+            [
+                (int(article_id), dict_id, compressor.compress(text.encode('utf-8')))
+                for article_id, text in zip(article_ids, texts)
+            ]
+        )
+
+    def get(self, conn, article_ids):
+        """Bodies of the given articles as {article_id: text}"""
+        bodies = {}
+        article_ids = [int(article_id) for article_id in article_ids]
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(article_ids), 10000):
+            chunk = article_ids[i:i + 10000]
+            rows = conn.execute(
+                f"SELECT article_id, dict_id, body FROM {self.table_name} "
+                f"WHERE article_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for article_id, dict_id, body in rows:
+                bodies[article_id] = self.decompress(dict_id, body)
+        return bodies
+
+
+def _text(value):
+    """Body text of a cell; missing values become empty bodies"""
+    return '' if value is None or value != value else str(value)
@@ -1,88 +1,400 @@
-import sqlite3
+import os
+import re
+import threading
 import pandas as pd
-from datetime import datetime
-from ..config import settings
+import pyarrow as pa
+from datetime import datetime, timedelta
+from config import settings
+from .aggregates import SentimentAggregateStore, DailyRollupStore, ALL_TICKERS, rollup_rows
+from .sqlite_pool import SQLiteConnectionPool
+from .body_store import BodyStore
+from .query_cache import shared_cache, cache_key
+from analyzers.sentiment_index import SentimentIndex
+from processors.ticker_sentiment import normalize_ticker_sentiment, parse_tickers, TICKER_SENTIMENT_COLUMNS
+
+SCHEMA_VERSION = 5  # Bumped whenever _migrate gains a step
+
+# Columns of the paginated article table, and the ones it can be sorted by besides search rank
+PAGE_COLUMNS = ['id', 'published', 'title', 'source', 'tickers', 'sentiment_score', 'url']
+PAGE_SORT_COLUMNS = ('published', 'sentiment_score', 'source')
 
 class DatabaseStorage:
     def __init__(self):
-        self.conn = sqlite3.connect(settings.DATABASE_CONFIG['db_path'])
+        os.makedirs(os.path.dirname(settings.DATABASE_CONFIG['db_path']), exist_ok=True)
+        # Article bodies live compressed in their own table, readable from SQL via body_text()
+        self.bodies = BodyStore(settings.DATABASE_CONFIG['db_path'])
+        self.pool = SQLiteConnectionPool(
+            settings.DATABASE_CONFIG['db_path'],
+            readers=settings.DATABASE_CONFIG.get('read_connections', 4),
+            pragmas=settings.DATABASE_CONFIG.get('pragmas'),
+            on_connect=self.bodies.register
+        )
         self.table_name = settings.DATABASE_CONFIG['table_name']
+        self.ticker_sentiment_table = f"{self.table_name}_ticker_sentiment"
+        self.article_tickers_table = 'article_tickers'
+        self.fts_table = f"{self.table_name}_fts"
+        self.fts_source = f"{self.table_name}_fts_source"
+        self.rollups = DailyRollupStore(self.pool)
+        # Repeated load_data/search calls are served from memory until the next write
+        self.cache = shared_cache(
+            settings.DATABASE_CONFIG['db_path'],
+            settings.DATABASE_CONFIG.get('query_cache_bytes', 0)
+        )
+        self._cleanup_thread = None
+        self._column_names = None
         self._initialize_db()
+        self.aggregates = SentimentAggregateStore(self.pool)
+        # One live index per storage, so its in-memory state is shared by every session
+        self.sentiment_index = SentimentIndex(self.pool)
     
     def _initialize_db(self):
         """Initialize database tables if they don't exist"""
-        create_table_query = f"""
-        CREATE TABLE IF NOT EXISTS {self.table_name} (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            source TEXT,
-            title TEXT,
-            url TEXT UNIQUE,
-            content TEXT,
-            source_name TEXT,
-            published DATETIME,
-            tickers TEXT,  # Stored as comma-separated string
-            sentiment_score REAL,
-            type TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        with self.pool.writer() as conn:
+            create_table_query = f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT,
+                title TEXT,
+                url TEXT UNIQUE,
+                content TEXT,  -- Legacy; bodies are stored compressed in article_bodies
+                source_name TEXT,
+                published DATETIME,
+                tickers TEXT,  -- Stored as comma-separated string
+                sentiment_score REAL,
+                type TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+            conn.execute(create_table_query)
+            
+            # Provider per-ticker relevance and sentiment, one row per (article, ticker)
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.ticker_sentiment_table} (
+                url TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                relevance_score REAL,
+                ticker_sentiment_score REAL,
+                ticker_sentiment_label TEXT,
+                PRIMARY KEY (url, ticker)
+            )
+            """)
+            
+            # One row per (article, ticker), so ticker/date filters are index range scans
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.article_tickers_table} (
+                article_id INTEGER NOT NULL,
+                ticker TEXT NOT NULL,
+                published DATETIME,
+                PRIMARY KEY (article_id, ticker)
+            ) WITHOUT ROWID
+            """)
+            conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{self.article_tickers_table}_ticker_published
+            ON {self.article_tickers_table} (ticker, published, article_id)
+            """)
+            conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{self.table_name}_published
+            ON {self.table_name} (published)
+            """)
+            # Sort orders of the paginated article table (id rides along as the rowid)
+            conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{self.table_name}_sentiment_score
+            ON {self.table_name} (sentiment_score)
+            """)
+            conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{self.table_name}_source
+            ON {self.table_name} (source)
+            """)
+            
+            self.bodies.initialize(conn)
+            
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            self._migrate(conn, version)
+            self._create_fts_index(conn, rebuild=version < 5)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+            if version < 4:
+                self._enable_incremental_vacuum(conn)
+            elif version < 5:
+                # Give back the pages the inline bodies used to take
+                conn.executescript("PRAGMA incremental_vacuum;")
+    
+    
+    def _create_fts_index(self, conn, rebuild=False):
+        """Full-text index over title and body, kept in sync by triggers.
+        
+        It is an external-content index over a view that decompresses the
+        bodies, so the text is stored only once, compressed.
+        """
+        conn.execute(f"""
+        CREATE VIEW IF NOT EXISTS {self.fts_source} AS
+        SELECT a.id, a.title, body_text(b.dict_id, b.body) AS content
+        FROM {self.table_name} a LEFT JOIN {self.bodies.table_name} b ON b.article_id = a.id
+        """)
+        conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5(
+            title, content,
+            content='{self.fts_source}', content_rowid='id',
+            tokenize='porter unicode61'
         )
+        """)
+        # Every article gets a body row (possibly empty) right after it is inserted,
+        # so that is when it enters the index
+        conn.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.bodies.table_name} BEGIN
+            INSERT INTO {self.fts_table} (rowid, title, content)
+            SELECT new.article_id, title, body_text(new.dict_id, new.body)
+            FROM {self.table_name} WHERE id = new.article_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad BEFORE DELETE ON {self.table_name} BEGIN
+            INSERT INTO {self.fts_table} ({self.fts_table}, rowid, title, content)
+            SELECT 'delete', old.id, old.title, body_text(dict_id, body)
+            FROM {self.bodies.table_name} WHERE article_id = old.id;
+            DELETE FROM {self.bodies.table_name} WHERE article_id = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF title ON {self.table_name} BEGIN
+            INSERT INTO {self.fts_table} ({self.fts_table}, rowid, title, content)
+            SELECT 'delete', old.id, old.title, body_text(dict_id, body)
+            FROM {self.bodies.table_name} WHERE article_id = old.id;
+            INSERT INTO {self.fts_table} (rowid, title, content)
+            SELECT new.id, new.title, body_text(dict_id, body)
+            FROM {self.bodies.table_name} WHERE article_id = new.id;
+        END;
+        """)
+        if rebuild:
+            conn.execute(f"INSERT INTO {self.fts_table} ({self.fts_table}) VALUES ('rebuild')")
+    
+    def _migrate(self, conn, version):
+        """Bring databases created by older versions up to SCHEMA_VERSION.
+        
+        The full-text index (version 2) is rebuilt by _create_fts_index for
+        anything older than version 5.
         """
-        self.conn.execute(create_table_query)
-        self.conn.commit()
+        if version < 1:
+            self._backfill_article_tickers(conn)
+        if version < 3:
+            self._backfill_rollups(conn)
+        if version < 5:
+            self._move_bodies_out(conn)
     
-    def save_data(self, df):
-        """Save DataFrame to database"""
-        if df.empty:
+    def _enable_incremental_vacuum(self, conn):
+        """Switch a database created without auto_vacuum over; needs one full VACUUM"""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
             return
+        conn.commit()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    
+    def _move_bodies_out(self, conn, chunk_size=5000):
+        """Compress the inline content column into the body store.
         
-        # Prepare data for insertion
-        df['tickers'] = df['tickers'].apply(lambda x: ",".join(x))
+        The old full-text index read content straight from the articles table,
+        so it is dropped here and rebuilt over the body view afterwards.
+        """
+        conn.executescript(f"""
+        DROP TRIGGER IF EXISTS {self.fts_table}_ai;
+        DROP TRIGGER IF EXISTS {self.fts_table}_ad;
+        DROP TRIGGER IF EXISTS {self.fts_table}_au;
+        DROP TABLE IF EXISTS {self.fts_table};
+        """)
+        if self.bodies.needs_dictionary:
+            self.bodies.train(conn, [row[0] for row in conn.execute(
+                f"SELECT content FROM {self.table_name} WHERE content != '' ORDER BY id DESC LIMIT ?",
+                (self.bodies.train_samples * 4,)
+            )])
+        
+        last_id = 0
+        while True:
+            rows = conn.execute(f"""
+            SELECT id, content FROM {self.table_name} WHERE id > ? ORDER BY id LIMIT ?
+            """, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            self.bodies.put(conn, [row[0] for row in rows], [row[1] for row in rows])
+            last_id = rows[-1][0]
+        conn.execute(f"UPDATE {self.table_name} SET content = NULL WHERE content IS NOT NULL")
+    
+    def _backfill_article_tickers(self, conn, chunk_size=10000):
+        """Split the legacy comma-separated tickers column into article_tickers"""
+        cursor = conn.execute(
+            f"SELECT id, tickers, published FROM {self.table_name} WHERE tickers IS NOT NULL AND tickers != ''"
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {self.article_tickers_table} (article_id, ticker, published) VALUES (?, ?, ?)",
+                [
+                    (article_id, ticker.strip(), published)
+                    for article_id, tickers, published in rows
+                    for ticker in tickers.split(',') if ticker.strip()
+                ]
+            )
+    
+    def _backfill_rollups(self, conn, chunk_size=10000):
+        """Roll up articles stored before the rollup table existed"""
+        for chunk in pd.read_sql_query(
+            f"SELECT url, source, published, tickers, sentiment_score FROM {self.table_name}",
+            conn, chunksize=chunk_size
+        ):
+            ticker_sentiment = pd.read_sql_query(
+                f"SELECT {', '.join(TICKER_SENTIMENT_COLUMNS)} FROM {self.ticker_sentiment_table} "
+                f"WHERE url IN ({','.join('?' * len(chunk))})",
+                conn, params=chunk['url'].tolist()
+            )
+            self.rollups.update(chunk, score_col='sentiment_score', ticker_sentiment=ticker_sentiment, conn=conn)
+    
+    def save_data(self, df, ticker_sentiment=None):
+        """Save DataFrame to database in chunked transactions and return the rows that were new.
+        
+        Provider per-ticker sentiment is read from the ``ticker_sentiment`` column
+        unless it is passed in already normalized.
+        """
+        if df.empty:
+            return df
+        
+        # Prepare data for insertion without touching the caller's DataFrame
+        df = df.drop_duplicates(subset=['url']).copy()
+        df['tickers'] = df['tickers'].apply(lambda x: ",".join(parse_tickers(x)))
         df['published'] = pd.to_datetime(df['published']).dt.strftime('%Y-%m-%d %H:%M:%S')
         
-        # Insert or ignore duplicates
+        chunk_size = settings.DATABASE_CONFIG.get('write_chunk_size', 5000)
+        new_rows = [
+            self._save_chunk(df.iloc[i:i + chunk_size], ticker_sentiment)
+            for i in range(0, len(df), chunk_size)
+        ]
+        return pd.concat(new_rows)
+    
+    def _save_chunk(self, chunk, ticker_sentiment=None):
+        """Insert one chunk and everything derived from it in a single write transaction"""
         insert_query = f"""
-        INSERT OR IGNORE INTO {self.table_name}
-        (source, title, url, content, source_name, published, tickers, sentiment_score, type)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO {self.table_name}
+        (source, title, url, source_name, published, tickers, sentiment_score, type)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (url) DO NOTHING
         """
         
-        data_to_insert = df[[
-            'source', 'title', 'url', 'content', 'source_name', 
-            'published', 'tickers', 'sentiment_score', 'type'
-        ]].values.tolist()
+        if self.bodies.needs_dictionary:
+            self._train_body_dictionary(chunk['content'].tolist())
         
-        cursor = self.conn.cursor()
-        cursor.executemany(insert_query, data_to_insert)
-        self.conn.commit()
+        with self.pool.writer() as conn:
+            # Only rows that are actually new feed the derived tables
+            new_rows = chunk[~chunk['url'].isin(self._existing_urls(conn, chunk['url'].tolist()))]
+            conn.executemany(insert_query, new_rows[[
+                'source', 'title', 'url', 'source_name', 
+                'published', 'tickers', 'sentiment_score', 'type'
+            ]].values.tolist())
+            ids = dict(conn.execute(
+                f"SELECT url, id FROM {self.table_name} WHERE url IN ({','.join('?' * len(new_rows))})",
+                new_rows['url'].tolist()
+            ).fetchall()) if not new_rows.empty else {}
+            self.bodies.put(conn, new_rows['url'].map(ids), new_rows['content'])
+            conn.executemany(f"""
+            INSERT OR IGNORE INTO {self.article_tickers_table} (article_id, ticker, published)
+            SELECT id, ?, published FROM {self.table_name} WHERE url = ?
+            """, [
+                (ticker, url)
+                for url, tickers in zip(new_rows['url'], new_rows['tickers'])
+                for ticker in parse_tickers(tickers)
+            ])
+            if ticker_sentiment is None:
+                ticker_sentiment = normalize_ticker_sentiment(new_rows)
+            else:
+                ticker_sentiment = ticker_sentiment[ticker_sentiment['url'].isin(new_rows['url'])]
+            conn.executemany(f"""
+            INSERT OR IGNORE INTO {self.ticker_sentiment_table}
+            ({', '.join(TICKER_SENTIMENT_COLUMNS)})
+            VALUES (?, ?, ?, ?, ?)
+            """, ticker_sentiment[TICKER_SENTIMENT_COLUMNS].values.tolist())
+            self.aggregates.update(new_rows, score_col='sentiment_score', ticker_sentiment=ticker_sentiment, conn=conn)
+            self.rollups.update(new_rows, score_col='sentiment_score', ticker_sentiment=ticker_sentiment, conn=conn)
+        if not new_rows.empty:
+            self.cache.invalidate()
+        return new_rows
     
-    def load_data(self, tickers=None, start_date=None, end_date=None, limit=1000):
-        """Load data from database with optional filters"""
-        query = f"SELECT * FROM {self.table_name}"
+    def _train_body_dictionary(self, texts):
+        """Train the body dictionary once enough bodies have been seen"""
+        with self.pool.writer() as conn:
+            # Under the database's write lock, so two processes can't both train one
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            if self.bodies.refresh(conn):
+                return
+            stored = self.bodies.get(conn, [row[0] for row in conn.execute(
+                f"SELECT article_id FROM {self.bodies.table_name} ORDER BY article_id DESC LIMIT ?",
+                (self.bodies.train_samples * 4,)
+            )])
+            self.bodies.train(conn, list(texts) + list(stored.values()))
+    
+    def get_content(self, article_ids):
+        """Article bodies by article id, decompressed on demand"""
+        with self.pool.reader() as conn:
+            return self.bodies.get(conn, article_ids)
+    
+    def _attach_content(self, conn, df):
+        """Fill the content column of loaded rows from the body store"""
+        if not df.empty and 'content' in df.columns and 'id' in df.columns:
+            bodies = self.bodies.get(conn, df['id'].tolist())
+            df['content'] = df['id'].map(bodies)
+        return df
+    
+    def is_empty(self):
+        """Whether no article has been stored yet"""
+        with self.pool.reader() as conn:
+            return conn.execute(f"SELECT 1 FROM {self.table_name} LIMIT 1").fetchone() is None
+    
+    def _existing_urls(self, conn, urls):
+        """Return the subset of urls already stored"""
+        existing = set()
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            rows = conn.execute(
+                f"SELECT url FROM {self.table_name} WHERE url IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            existing.update(row[0] for row in rows)
+        return existing
+    
+    def _filter_conditions(self, tickers=None, start_date=None, end_date=None, sources=None, alias=''):
+        """SQL conditions and parameters for the common article filters"""
         conditions = []
         params = []
         
-        if tickers:
-            # Create conditions for each ticker
-            ticker_conditions = []
-            for ticker in tickers:
-                ticker_conditions.append("tickers LIKE ?")
-                params.append(f"%{ticker}%")
-            conditions.append(f"({' OR '.join(ticker_conditions)})")
-        
+        date_conditions = []
+        date_params = []
         if start_date:
-            conditions.append("published >= ?")
-            params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
+            date_conditions.append("published >= ?")
+            date_params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
         
         if end_date:
-            conditions.append("published <= ?")
-            params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
+            date_conditions.append("published <= ?")
+            date_params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
         
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+        if tickers:
+            # Exact ticker match through the (ticker, published) index
+            ticker_query = f"""
+            SELECT article_id FROM {self.article_tickers_table}
+            WHERE ticker IN ({','.join('?' * len(tickers))})
+            """
+            params.extend(tickers)
+            if date_conditions:
+                ticker_query += " AND " + " AND ".join(date_conditions)
+                params.extend(date_params)
+            conditions.append(f"{alias}id IN ({ticker_query})")
         
-        query += f" ORDER BY published DESC LIMIT {limit}"
+        conditions.extend(f"{alias}{condition}" for condition in date_conditions)
+        params.extend(date_params)
         
-        df = pd.read_sql_query(query, self.conn, params=params if params else None)
+        if sources:
+            conditions.append(f"{alias}source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
         
+        return conditions, params
+    
+    def _to_frame(self, df):
+        """Convert stored columns back to their DataFrame types"""
         # Convert tickers back to list
         if not df.empty and 'tickers' in df.columns:
             df['tickers'] = df['tickers'].str.split(',')
@@ -93,13 +405,345 @@ class DatabaseStorage:
         
         return df
     
-    def cleanup_old_data(self, days=30):
-        """Remove data older than specified days"""
+    def load_data(self, tickers=None, start_date=None, end_date=None, limit=1000, with_content=True):
+        """Load data from database with optional filters; ``limit=None`` returns every match.
+        
+        Bodies are decompressed for the returned rows only, and skipped
+        entirely with ``with_content=False``. Results are cached until the
+        next write; every call gets its own copy.
+        """
+        return self.cache.get_or_load(
+            cache_key('load_data', tickers, start_date, end_date, limit, with_content),
+            lambda: self._load_data(tickers, start_date, end_date, limit, with_content)
+        )
+    
+    def _load_data(self, tickers, start_date, end_date, limit, with_content):
+        query = f"SELECT * FROM {self.table_name}"
+        conditions, params = self._filter_conditions(tickers, start_date, end_date)
+        
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        query += " ORDER BY published DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        
+        with self.pool.reader() as conn:
+            df = pd.read_sql_query(query, conn, params=params if params else None)
+            if with_content:
+                df = self._attach_content(conn, df)
+        
+        return self._to_frame(df)
+    
+    def iter_data(self, tickers=None, start_date=None, end_date=None, sources=None, columns=None,
+                  chunk_size=10000, descending=False, as_arrow=False):
+        """Yield matching articles in chunks of at most ``chunk_size`` rows, ordered by (published, id).
+        
+        Pages are fetched by keyset rather than OFFSET, so each one is an index
+        range scan however deep the walk goes, and memory stays bounded by the
+        chunk size. Every page borrows a reader for just that query, so a long
+        export doesn't hold a read transaction open against the writer.
+        Articles without a publication time are skipped.
+        """
+        if columns is not None:
+            unknown = set(columns) - set(self._columns())
+            if unknown:
+                raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        selected = list(dict.fromkeys(list(columns or self._columns()) + ['published', 'id']))
+        conditions, params = self._filter_conditions(tickers, start_date, end_date, sources)
+        conditions.append("published IS NOT NULL")
+        direction, operator = ('DESC', '<') if descending else ('ASC', '>')
+        
+        cursor = None
+        while True:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if cursor is not None:
+                page_conditions.append(f"(published, id) {operator} (?, ?)")
+                page_params.extend(cursor)
+            query = f"""
+            SELECT {', '.join(selected)} FROM {self.table_name}
+            WHERE {' AND '.join(page_conditions)}
+            ORDER BY published {direction}, id {direction}
+            LIMIT ?
+            """
+            with self.pool.reader() as conn:
+                df = self._attach_content(conn, pd.read_sql_query(query, conn, params=page_params + [chunk_size]))
+            if df.empty:
+                return
+            cursor = (df['published'].iloc[-1], int(df['id'].iloc[-1]))
+            
+            df = self._to_frame(df[list(columns) if columns is not None else selected].copy())
+            yield pa.Table.from_pandas(df, preserve_index=False) if as_arrow else df
+            if len(df) < chunk_size:
+                return
+    
+    def article_rollups(self, tickers, start_day=None, end_day=None):
+        """Rollup rows of the articles mentioning any of ``tickers``, each counted once.
+        
+        Shaped like the article-level rows of DailyRollupStore.read; summing
+        its per-ticker rows instead would count an article once for every one
+        of the tickers it mentions.
+        """
+        start = pd.Timestamp(start_day) if start_day else None
+        end = pd.Timestamp(end_day) + pd.Timedelta(days=1, microseconds=-1) if end_day else None
+        chunks = list(self.iter_data(tickers=list(tickers), start_date=start, end_date=end,
+                                     columns=['source', 'published', 'sentiment_score']))
+        articles = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(
+            columns=['source', 'published', 'sentiment_score'])
+        rows = rollup_rows(pd.DataFrame({
+            'ticker': ALL_TICKERS,
+            'source': articles['source'],
+            'published': articles['published'],
+            'score': pd.to_numeric(articles['sentiment_score'], errors='coerce')
+        }))
+        rows['day'] = pd.to_datetime(rows['day']).dt.date
+        return rows
+    
+    def _columns(self):
+        """Column names of the articles table"""
+        if self._column_names is None:
+            with self.pool.reader() as conn:
+                self._column_names = [
+                    row[1] for row in conn.execute(f"PRAGMA table_info({self.table_name})").fetchall()
+                ]
+        return self._column_names
+    
+    def search(self, text, tickers=None, start_date=None, end_date=None, sources=None, limit=50):
+        """Ranked full-text search over titles and content.
+        
+        Words are ANDed, "quoted text" is matched as a phrase and a trailing *
+        makes a prefix query (earn* matches earnings). Results are ordered by
+        BM25 with title matches weighted higher, and carry highlighted
+        ``title_highlight`` and ``snippet`` columns.
+        """
+        match = build_match_query(text)
+        if not match:
+            return pd.DataFrame()
+        return self.cache.get_or_load(
+            cache_key('search', match, tickers, start_date, end_date, sources, limit),
+            lambda: self._search(match, tickers, start_date, end_date, sources, limit)
+        )
+    
+    def _search(self, match, tickers, start_date, end_date, sources, limit):
+        conditions, params = self._filter_conditions(tickers, start_date, end_date, sources, alias='a.')
+        query = f"""
+        SELECT a.*,
+               highlight({self.fts_table}, 0, '**', '**') AS title_highlight,
+               snippet({self.fts_table}, 1, '**', '**', '…', 16) AS snippet,
+               bm25({self.fts_table}, 10.0, 1.0) AS rank
+        FROM {self.fts_table}
+        JOIN {self.table_name} a ON a.id = {self.fts_table}.rowid
+        WHERE {self.fts_table} MATCH ?
+        """
+        if conditions:
+            query += " AND " + " AND ".join(conditions)
+        query += f" ORDER BY rank LIMIT {int(limit)}"
+        
+        with self.pool.reader() as conn:
+            df = self._attach_content(conn, pd.read_sql_query(query, conn, params=[match] + params))
+        
+        return self._to_frame(df)
+    
+    def _page_filters(self, text=None, tickers=None, start_date=None, end_date=None, sources=None, labels=None):
+        """FROM clause, conditions and parameters shared by page_data and count_data"""
+        source = f"{self.table_name} a"
+        conditions = []
+        params = []
+        match = build_match_query(text) if text else ''
+        if match:
+            source = f"{self.fts_table} JOIN {self.table_name} a ON a.id = {self.fts_table}.rowid"
+            conditions.append(f"{self.fts_table} MATCH ?")
+            params.append(match)
+        
+        filter_conditions, filter_params = self._filter_conditions(tickers, start_date, end_date, sources, alias='a.')
+        conditions.extend(filter_conditions)
+        params.extend(filter_params)
+        
+        if labels:
+            # Same cut-offs as the sentiment_label of the stored articles
+            thresholds = settings.SENTIMENT_THRESHOLDS
+            label_conditions = {
+                'positive': ("a.sentiment_score > ?", [thresholds['positive']]),
+                'negative': ("a.sentiment_score < ?", [thresholds['negative']]),
+                'neutral': ("a.sentiment_score BETWEEN ? AND ?", [thresholds['negative'], thresholds['positive']])
+            }
+            unknown = set(labels) - set(label_conditions)
+            if unknown:
+                raise ValueError(f"Unknown sentiment labels: {sorted(unknown)}")
+            conditions.append("(" + " OR ".join(label_conditions[label][0] for label in labels) + ")")
+            for label in labels:
+                params.extend(label_conditions[label][1])
+        return source, conditions, params, bool(match)
+    
+    def count_data(self, text=None, tickers=None, start_date=None, end_date=None, sources=None, labels=None):
+        """How many articles page_data pages through for the same filters"""
+        return self.cache.get_or_load(
+            cache_key('count_data', text, tickers, start_date, end_date, sources, labels),
+            lambda: self._count_data(text, tickers, start_date, end_date, sources, labels)
+        )
+    
+    def _count_data(self, text, tickers, start_date, end_date, sources, labels):
+        source, conditions, params, _ = self._page_filters(text, tickers, start_date, end_date, sources, labels)
+        query = f"SELECT COUNT(*) FROM {source}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self.pool.reader() as conn:
+            return conn.execute(query, params).fetchone()[0]
+    
+    def page_data(self, text=None, tickers=None, start_date=None, end_date=None, sources=None, labels=None,
+                  sort_by='published', descending=True, page=0, page_size=50, after=None):
+        """One page of matching articles, filtered and sorted by the database.
+        
+        ``text`` is a search query as for ``search`` and ``labels`` picks
+        sentiment labels. Pages are read with OFFSET unless ``after``, the
+        ``df.attrs['cursor']`` of the previous page, is given: then the page
+        is an index range scan after that row, however deep it is. Sorting by
+        ``'rank'`` orders search results by relevance and always uses OFFSET.
+        Only the page is converted, and tickers stay comma-separated.
+        """
+        if sort_by not in PAGE_SORT_COLUMNS + ('rank',):
+            raise ValueError(f"Unsupported sort column: {sort_by}")
+        return self.cache.get_or_load(
+            cache_key('page_data', text, tickers, start_date, end_date, sources, labels,
+                      sort_by, descending, page, page_size, repr(after)),
+            lambda: self._page_data(text, tickers, start_date, end_date, sources, labels,
+                                    sort_by, descending, page, page_size, after)
+        )
+    
+    def _page_data(self, text, tickers, start_date, end_date, sources, labels,
+                   sort_by, descending, page, page_size, after):
+        source, conditions, params, searching = self._page_filters(
+            text, tickers, start_date, end_date, sources, labels
+        )
+        columns = ', '.join(f"a.{column}" for column in PAGE_COLUMNS)
+        if searching:
+            columns += f", bm25({self.fts_table}, 10.0, 1.0) AS rank"
+        elif sort_by == 'rank':
+            sort_by = 'published'
+        
+        def select(extra_conditions, extra_params, order, limit, offset):
+            query = f"SELECT {columns} FROM {source}"
+            if conditions or extra_conditions:
+                query += " WHERE " + " AND ".join(conditions + extra_conditions)
+            query += f" ORDER BY {order} LIMIT ? OFFSET ?"
+            return pd.read_sql_query(query, conn, params=params + extra_params + [limit, offset])
+        
+        direction = 'DESC' if descending else 'ASC'
+        order = "rank, a.id" if sort_by == 'rank' else f"a.{sort_by} {direction}, a.id {direction}"
+        keyset = sort_by != 'rank' and after is not None and after[0] is not None
+        with self.pool.reader() as conn:
+            if not keyset:
+                df = select([], [], order, page_size, page * page_size)
+            else:
+                df = select([f"(a.{sort_by}, a.id) {'<' if descending else '>'} (?, ?)"], list(after),
+                            order, page_size, 0)
+                # NULLs sort last descending, out of reach of the range scan
+                if descending and len(df) < page_size:
+                    nulls = select([f"a.{sort_by} IS NULL"], [], f"a.id {direction}", page_size - len(df), 0)
+                    if not nulls.empty:
+                        df = pd.concat([df, nulls], ignore_index=True) if not df.empty else nulls
+        
+        cursor = None
+        if not df.empty and sort_by != 'rank':
+            last = df[sort_by].iloc[-1]
+            # A NULL sort value can't anchor a keyset; the next page falls back to OFFSET
+            cursor = (None if pd.isna(last) else last, int(df['id'].iloc[-1]))
+        if not df.empty:
+            df['published'] = pd.to_datetime(df['published'], format='ISO8601')
+        df.attrs['cursor'] = cursor
+        return df
+    
+    def load_ticker_sentiment(self, tickers=None):
+        """Load provider per-ticker sentiment, optionally for some tickers only"""
+        query = f"SELECT * FROM {self.ticker_sentiment_table}"
+        params = []
+        if tickers:
+            query += f" WHERE ticker IN ({','.join('?' * len(tickers))})"
+            params.extend(tickers)
+        with self.pool.reader() as conn:
+            return pd.read_sql_query(query, conn, params=params if params else None)
+    
+    def cleanup_old_data(self, days=None):
+        """Remove data older than specified days and return how many articles went.
+        
+        Articles are deleted oldest first through the published index, a batch
+        per write transaction, so ingest can take the writer in between; the
+        daily rollups, daily ticker aggregates and sentiment index checkpoints
+        past retention follow in batches of the same size. The pages each
+        batch frees are returned to the OS with incremental_vacuum.
+        """
+        days = settings.DATA_STORAGE_DAYS if days is None else days
+        batch_size = settings.DATABASE_CONFIG.get('retention_batch_size', 1000)
+        vacuum_pages = settings.DATABASE_CONFIG.get('vacuum_pages', 256)
         cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
-        delete_query = f"DELETE FROM {self.table_name} WHERE published < ?"
-        self.conn.execute(delete_query, (cutoff_date,))
-        self.conn.commit()
+        
+        removed = 0
+        while True:
+            with self.pool.writer() as conn:
+                ids = [row[0] for row in conn.execute(f"""
+                SELECT id FROM {self.table_name} WHERE published < ? ORDER BY published LIMIT ?
+                """, (cutoff_date, batch_size))]
+                if ids:
+                    placeholders = ','.join('?' * len(ids))
+                    conn.execute(f"DELETE FROM {self.article_tickers_table} WHERE article_id IN ({placeholders})", ids)
+                    conn.execute(f"""
+                    DELETE FROM {self.ticker_sentiment_table}
+                    WHERE url IN (SELECT url FROM {self.table_name} WHERE id IN ({placeholders}))
+                    """, ids)
+                    conn.execute(f"DELETE FROM {self.table_name} WHERE id IN ({placeholders})", ids)
+                # executescript commits the batch first and steps the pragma to completion;
+                # execute() would release a single page
+                conn.executescript(f"PRAGMA incremental_vacuum({vacuum_pages});")
+            if not ids:
+                break
+            self.cache.invalidate()
+            removed += len(ids)
+        
+        for prune in (self.rollups.delete_before, self.aggregates.delete_before, self.sentiment_index.prune):
+            deleted = batch_size
+            while deleted == batch_size:
+                with self.pool.writer() as conn:
+                    deleted = prune(cutoff_date, conn=conn, limit=batch_size)
+                    conn.executescript(f"PRAGMA incremental_vacuum({vacuum_pages});")
+        return removed
+    
+    def cleanup_in_background(self, days=None):
+        """Run cleanup_old_data on a separate thread unless a cleanup is already running"""
+        if self._cleanup_thread is not None and self._cleanup_thread.is_alive():
+            return self._cleanup_thread
+        self._cleanup_thread = threading.Thread(
+            target=self._cleanup_safely, args=(days,), name='retention-cleanup'
+        )
+        self._cleanup_thread.start()
+        return self._cleanup_thread
+    
+    def _cleanup_safely(self, days):
+        try:
+            removed = self.cleanup_old_data(days)
+            if removed:
+                print(f"Removed {removed} articles past retention")
+        except Exception as e:
+            print(f"Error cleaning up old data: {str(e)}")
     
     def close(self):
-        """Close database connection"""
-        self.conn.close()
\ No newline at end of file
+        """Close all database connections, once a running cleanup has finished"""
+        if self._cleanup_thread is not None:
+            self._cleanup_thread.join()
+        self.pool.close()
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query: quoted phrases, prefix terms and plain words, ANDed"""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', text or ''):
+        if phrase:
+            tokens = re.findall(r'\w+', phrase)
+            if tokens:
+                terms.append('"' + ' '.join(tokens) + '"')
+            continue
+        prefix = word.endswith('*')
+        tokens = re.findall(r'\w+', word)
+        for i, token in enumerate(tokens):
+            terms.append(f'"{token}"' + ('*' if prefix and i == len(tokens) - 1 else ''))
+    return ' '.join(terms)
@@ -0,0 +1,180 @@
+import os
+import pandas as pd
+from config import settings
+
+
+class DuckDBStorage:
+    """Optional analytical backend running vectorized, multi-threaded SQL over the
+    Parquet article store.
+
+    ``load_data`` mirrors DatabaseStorage.load_data and ``query`` mirrors
+    DailyRollupStore.query, so either can stand in for the other; ``sql`` runs
+    ad-hoc queries against the ``articles`` view, which holds the latest
+    version of every article. The view globs the segment files on every
+    query, so one instance stays valid across flushes and compactions, and
+    each query runs on its own cursor, so sessions can share it. When the
+    SQLite database is present it is attached read-only as ``news`` as
+    well. Requires the ``duckdb`` package.
+    """
+
+    def __init__(self, parquet_root=None, db_path=None, threads=None, memory_limit=None):
+        # Imported lazily so duckdb is only needed when this backend is selected
+        import duckdb
+
+        config = settings.DUCKDB_CONFIG
+        self._io_error = duckdb.IOException
+        self.parquet_root = parquet_root or settings.FILE_STORAGE_CONFIG['root']
+        self.partition_by = list(settings.FILE_STORAGE_CONFIG['partition_by'])
+        self.db_path = db_path or settings.DATABASE_CONFIG['db_path']
+        duckdb_config = {'threads': threads or config['threads'] or os.cpu_count()}
+        if memory_limit or config['memory_limit']:
+            duckdb_config['memory_limit'] = memory_limit or config['memory_limit']
+        self.conn = duckdb.connect(database=':memory:', config=duckdb_config)
+        self._view_created = False
+        self._attach_sqlite()
+
+    @property
+    def segment_glob(self):
+        """Glob of the segment files; rooted in the partition directories, so the key index
+        under _keys/ is never matched"""
+        root = self.parquet_root.replace("'", "''")
+        if self.partition_by:
+            return os.path.join(root, f'{self.partition_by[0]}=*', '**', '*.parquet')
+        return os.path.join(root, '*.parquet')
+
+    @property
+    def has_articles(self):
+        """Whether the ``articles`` view exists; created once the first segment is written"""
+        if not self._view_created:
+            try:
+                self.conn.execute(f"""
+                CREATE OR REPLACE VIEW articles AS
+                SELECT * EXCLUDE (seq)
+                FROM read_parquet('{self.segment_glob}', hive_partitioning = true, union_by_name = true)
+                QUALIFY row_number() OVER (PARTITION BY id ORDER BY seq DESC) = 1
+                """)
+                self._view_created = True
+            except self._io_error:
+                # No segments yet
+                pass
+        return self._view_created
+
+    def _attach_sqlite(self):
+        if not os.path.exists(self.db_path):
+            return
+        try:
+            self.conn.execute(f"ATTACH '{self.db_path}' AS news (TYPE sqlite, READ_ONLY)")
+        except Exception as e:
+            # The sqlite extension may not be installable offline; Parquet queries still work
+            print(f"SQLite database not attached to DuckDB: {str(e)}")
+
+    def sql(self, query, params=None):
+        """Run an ad-hoc query and return the result as a DataFrame"""
+        try:
+            return self._execute(query, params)
+        except self._io_error:
+            # A compaction replaced segments between the glob and the read; the retry sees the new ones
+            return self._execute(query, params)
+
+    def _execute(self, query, params):
+        cursor = self.conn.cursor()
+        try:
+            return cursor.execute(query, params or []).df()
+        finally:
+            cursor.close()
+
+    def _conditions(self, tickers=None, start_date=None, end_date=None, sources=None):
+        conditions = []
+        params = []
+        if start_date is not None:
+            start = _utc(start_date)
+            conditions.extend(["published >= ?", "day >= ?"])
+            params.extend([start.to_pydatetime(), start.strftime('%Y-%m-%d')])
+        if end_date is not None:
+            end = _utc(end_date)
+            conditions.extend(["published <= ?", "day <= ?"])
+            params.extend([end.to_pydatetime(), end.strftime('%Y-%m-%d')])
+        if tickers:
+            conditions.append("list_has_any(tickers, ?)")
+            params.append(list(tickers))
+        if sources:
+            conditions.append(f"source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        return conditions, params
+
+    def load_data(self, tickers=None, start_date=None, end_date=None, limit=1000, with_content=True):
+        """Load articles with optional filters, newest first; ``limit=None`` returns every match.
+
+        Bodies aren't read at all with ``with_content=False``; the content
+        column is then empty.
+        """
+        columns = ['source', 'title', 'url', 'content', 'published', 'tickers', 'sentiment_score', 'sentiment_label']
+        if not self.has_articles:
+            return pd.DataFrame(columns=columns)
+
+        conditions, params = self._conditions(tickers, start_date, end_date)
+        query = f"""
+        SELECT source, title, url, {'content' if with_content else 'NULL AS content'}, published, tickers,
+               compound AS sentiment_score, sentiment_label
+        FROM articles
+        """
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY published DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+
+        df = self.sql(query, params)
+        df['tickers'] = df['tickers'].apply(lambda v: list(v) if v is not None else [])
+        return df
+
+    def query(self, by=('day',), per_ticker=False, tickers=None, sources=None, start_day=None, end_day=None):
+        """Article counts and mean score grouped by any of day, ticker, source and label.
+
+        Same contract as DailyRollupStore.query, computed from the articles
+        instead of the rollup table. Per-ticker rows use the article score.
+        """
+        by = list(by)
+        if not set(by) <= {'day', 'ticker', 'source', 'label'}:
+            raise ValueError(f"Unsupported grouping: {by}")
+        if not self.has_articles:
+            return pd.DataFrame(columns=by + ['count', 'mean'])
+
+        conditions, params = self._conditions(sources=sources)
+        if start_day:
+            conditions.append("day >= ?")
+            params.append(pd.Timestamp(start_day).strftime('%Y-%m-%d'))
+        if end_day:
+            conditions.append("day <= ?")
+            params.append(pd.Timestamp(end_day).strftime('%Y-%m-%d'))
+        thresholds = settings.SENTIMENT_THRESHOLDS
+        source = "articles"
+        if per_ticker or 'ticker' in by or tickers:
+            source = "(SELECT *, unnest(tickers) AS ticker FROM articles)"
+            if tickers:
+                conditions.append(f"ticker IN ({','.join('?' * len(tickers))})")
+                params.extend(tickers)
+        query = f"""
+        SELECT {', '.join(by)}, count(*) AS count, avg(compound) AS mean
+        FROM (
+            SELECT *, CASE WHEN compound > {thresholds['positive']} THEN 'positive'
+                           WHEN compound < {thresholds['negative']} THEN 'negative'
+                           ELSE 'neutral' END AS label
+            FROM {source}
+        )
+        WHERE compound IS NOT NULL {''.join(' AND ' + c for c in conditions)}
+        GROUP BY {', '.join(by)}
+        ORDER BY {', '.join(by)}
+        """
+        df = self.sql(query, params)
+        if 'day' in by:
+            df['day'] = pd.to_datetime(df['day']).dt.date
+        return df
+
+    def close(self):
+        self.conn.close()
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts
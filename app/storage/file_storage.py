@@ -0,0 +1,399 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from config import settings
+from processors.ticker_sentiment import parse_tickers
+
+ARTICLE_SCHEMA = pa.schema([
+    ('title', pa.string()),
+    ('content', pa.string()),
+    ('source', pa.string()),
+    ('published', pa.timestamp('us', tz='UTC')),
+    ('url', pa.string()),
+    ('urlToImage', pa.string()),
+    ('tickers', pa.list_(pa.string())),
+    ('provider_score', pa.float64()),
+    ('neg', pa.float64()),
+    ('neu', pa.float64()),
+    ('pos', pa.float64()),
+    ('compound', pa.float64()),
+    ('sentiment_label', pa.string())
+])
+
+# Bookkeeping columns of every segment row: the stable article id and the write sequence
+SEGMENT_FIELDS = [pa.field('id', pa.uint64()), pa.field('seq', pa.int64())]
+
+# Article bodies dominate segment size and compress far better with zstd than snappy
+SEGMENT_COMPRESSION = 'zstd'
+
+# One lock per store root, shared by every ParquetStore instance in the process
+_root_locks = defaultdict(threading.Lock)
+
+
+class ParquetStore:
+    """Log-structured article store on top of a hive-partitioned Parquet dataset.
+
+    Writes go to a small in-memory buffer that is flushed as immutable
+    segments under ``day=YYYY-MM-DD/`` (and ``source=.../`` when configured),
+    sorted by publication time. Every row carries a stable article ``id``,
+    hashed from the key columns, and the ``seq`` of the write that produced
+    it; a re-fetched article is simply written again and the newest version
+    wins. Reads merge segments lazily, and compaction rewrites a partition
+    into a single deduplicated segment and drops expired days.
+
+    Known ids are kept in a side index under ``_keys/`` so ``append`` can tell
+    which articles are new; readers skip it because of its leading underscore.
+    Segments and key files are written under a hidden ``.tmp`` name, which
+    neither scans nor compaction pick up, and renamed into place once
+    complete, so nobody ever opens a half-written file.
+    """
+
+    def __init__(self, root=None, partition_by=None, key=None, schema=ARTICLE_SCHEMA):
+        config = settings.FILE_STORAGE_CONFIG
+        self.root = root or config['root']
+        self.partition_by = list(partition_by or config['partition_by'])
+        self.key = list(key or config['key'])
+        self.schema = schema
+        self.buffer_rows = config['buffer_rows']
+        self.max_segments = config['max_segments']
+        self.retention_days = config['retention_days']
+        self.keys_dir = os.path.join(self.root, '_keys')
+        self._keys = None
+        self._pending_keys = []
+        self._buffer = []
+        self._buffered = 0
+        self._lock = _root_locks[os.path.abspath(self.root)]
+        # Guards the buffer and the key state; flushes run one at a time under _flush_lock
+        self._state_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._compaction = None
+        os.makedirs(self.keys_dir, exist_ok=True)
+
+    @property
+    def _segment_schema(self):
+        """Article columns plus the bookkeeping columns"""
+        schema = self.schema
+        for field in SEGMENT_FIELDS:
+            schema = schema.append(field)
+        return schema
+
+    @property
+    def _full_schema(self):
+        """Segment columns plus the partition columns"""
+        schema = self._segment_schema
+        for name in self.partition_by:
+            if schema.get_field_index(name) == -1:
+                schema = schema.append(pa.field(name, pa.string()))
+        return schema
+
+    def _load_keys(self):
+        """Known ids; call with _state_lock held"""
+        if self._keys is None:
+            files = [os.path.join(self.keys_dir, f) for f in os.listdir(self.keys_dir) if f.endswith('.parquet')]
+            parts = [pq.read_table(f).column('key').to_numpy() for f in files]
+            self._keys = set(np.concatenate(parts).tolist()) if parts else set()
+        return self._keys
+
+    def _hash_keys(self, df):
+        return pd.util.hash_pandas_object(df[self.key], index=False).to_numpy()
+
+    def _normalize(self, df):
+        """Coerce a batch onto the store schema; missing columns become nulls"""
+        df = df.copy()
+        df['published'] = pd.to_datetime(df['published'], utc=True, errors='coerce')
+        df = df[df['published'].notna()]
+        df['tickers'] = df['tickers'].apply(parse_tickers) if 'tickers' in df.columns else [[]] * len(df)
+        for name in self.schema.names:
+            if name not in df.columns:
+                df[name] = None
+        for name in ('title', 'source', 'url'):
+            df[name] = df[name].fillna('').astype(str)
+        return df[self.schema.names].reset_index(drop=True)
+
+    def append(self, df):
+        """Buffer a batch for writing and return the rows of articles not stored before.
+
+        Articles already in the store are written again; the newer version
+        replaces the old one on read and at compaction.
+        """
+        if df.empty:
+            return df
+        df = self._normalize(df)
+        df['id'] = self._hash_keys(df)
+        df['seq'] = time.time_ns()
+        df = df.drop_duplicates(subset='id', keep='last').reset_index(drop=True)
+
+        with self._state_lock:
+            known = self._load_keys()
+            is_new = ~df['id'].isin(known).to_numpy()
+            new_ids = df.loc[is_new, 'id'].tolist()
+            known.update(new_ids)
+            self._pending_keys.extend(new_ids)
+
+            self._buffer.append(df)
+            self._buffered += len(df)
+            full = self._buffered >= self.buffer_rows
+        if full:
+            self.flush()
+        return df[is_new].drop(columns=['id', 'seq']).reset_index(drop=True)
+
+    def flush(self):
+        """Write the buffer out as one immutable segment per partition.
+
+        The batches buffered when the flush starts are written while appends
+        and reads go on, and only leave the buffer once their segment and keys
+        are on disk, so a failed flush loses nothing and readers never miss
+        them. Rows seen twice in between are deduplicated on read.
+        """
+        with self._flush_lock:
+            with self._state_lock:
+                batches = list(self._buffer)
+                pending_keys = list(self._pending_keys)
+            if not batches:
+                return
+            self._write_segment(_latest(pd.concat(batches, ignore_index=True)))
+
+            # Keys go in after the data, so a crash in between can only rewrite rows, never lose them
+            if pending_keys:
+                self._write_keys(pa.table({'key': pa.array(pending_keys, pa.uint64())}))
+            with self._state_lock:
+                del self._buffer[:len(batches)]
+                del self._pending_keys[:len(pending_keys)]
+                self._buffered = sum(len(batch) for batch in self._buffer)
+
+    def _write_segment(self, df):
+        df = df.sort_values(['published', 'id'], kind='stable')
+        table = pa.Table.from_pandas(df, schema=self._segment_schema, preserve_index=False, safe=False)
+        if 'day' in self.partition_by:
+            table = table.append_column('day', pa.array(df['published'].dt.strftime('%Y-%m-%d')))
+        written = []
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([self._full_schema.field(n) for n in self.partition_by]),
+                                         flavor='hive'),
+            basename_template=f'.seg-{uuid.uuid4().hex}-{{i}}.parquet.tmp',
+            file_options=ds.ParquetFileFormat().make_write_options(compression=SEGMENT_COMPRESSION),
+            existing_data_behavior='overwrite_or_ignore',
+            file_visitor=lambda written_file: written.append(written_file.path)
+        )
+        with self._lock:
+            for path in written:
+                os.replace(path, _final_path(path))
+
+    def _write_keys(self, keys):
+        path = os.path.join(self.keys_dir, f'.keys-{uuid.uuid4().hex}.parquet.tmp')
+        pq.write_table(keys, path)
+        os.replace(path, _final_path(path))
+
+    def read(self, columns=None, start_date=None, end_date=None, sources=None, tickers=None):
+        """Load the latest version of every article, pruning partitions and row groups
+        with the given filters. Buffered rows are included."""
+        wanted = list(columns or self.schema.names)
+        start = _utc(start_date)
+        end = _utc(end_date)
+        filters = []
+        if start is not None:
+            filters.append(ds.field('published') >= pa.scalar(start, pa.timestamp('us', tz='UTC')))
+            if 'day' in self.partition_by:
+                filters.append(ds.field('day') >= start.strftime('%Y-%m-%d'))
+        if end is not None:
+            filters.append(ds.field('published') <= pa.scalar(end, pa.timestamp('us', tz='UTC')))
+            if 'day' in self.partition_by:
+                filters.append(ds.field('day') <= end.strftime('%Y-%m-%d'))
+        if sources:
+            filters.append(ds.field('source').isin(list(sources)))
+        expression = None
+        for condition in filters:
+            expression = condition if expression is None else expression & condition
+
+        read_columns = list(dict.fromkeys(wanted + ['published', 'id', 'seq'] + (['tickers'] if tickers else [])))
+        frames = []
+        with self._state_lock:
+            batches = list(self._buffer)
+        with self._lock:
+            if self._has_data():
+                dataset = ds.dataset(self.root, format='parquet', schema=self._full_schema, partitioning='hive')
+                frames.append(dataset.to_table(columns=read_columns, filter=expression).to_pandas())
+        if batches:
+            buffered = pd.concat(batches, ignore_index=True)
+            if start is not None:
+                buffered = buffered[buffered['published'] >= start]
+            if end is not None:
+                buffered = buffered[buffered['published'] <= end]
+            if sources:
+                buffered = buffered[buffered['source'].isin(list(sources))]
+            frames.append(buffered[read_columns])
+        if not frames:
+            return pd.DataFrame(columns=wanted)
+
+        df = _latest(pd.concat(frames, ignore_index=True))
+        if 'tickers' in df.columns:
+            df['tickers'] = df['tickers'].apply(lambda v: list(v) if v is not None else [])
+            if tickers:
+                wanted_tickers = set(tickers)
+                df = df[df['tickers'].apply(lambda v: not wanted_tickers.isdisjoint(v))]
+        df = df.sort_values('published', kind='stable')
+        return df[wanted].reset_index(drop=True)
+
+    def _has_data(self):
+        return any(not name.startswith(('_', '.')) for name in os.listdir(self.root))
+
+    def _partitions(self):
+        """Leaf partition directories and the segment files in each"""
+        partitions = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(('_', '.'))]
+            segments = [os.path.join(dirpath, f) for f in filenames if f.endswith('.parquet')]
+            if segments:
+                partitions[dirpath] = segments
+        return partitions
+
+    def _day_dir(self, partition):
+        return os.path.join(self.root, os.path.relpath(partition, self.root).split(os.sep)[0])
+
+    def _cutoff_day(self):
+        if self.retention_days is None or 'day' not in self.partition_by:
+            return None
+        return (pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+
+    def _is_expired(self, partition, cutoff):
+        return cutoff is not None and os.path.basename(self._day_dir(partition)) < f'day={cutoff}'
+
+    def needs_compaction(self):
+        """Whether some partition has piled up segments or fallen out of retention"""
+        cutoff = self._cutoff_day()
+        return any(len(segments) > self.max_segments or self._is_expired(partition, cutoff)
+                   for partition, segments in self._partitions().items())
+
+    def compact(self):
+        """Merge each partition into one sorted segment holding the latest version of
+        every article, and delete the days past the retention window.
+
+        Buffered rows aren't touched; compact_in_background flushes before it starts.
+        """
+        cutoff = self._cutoff_day()
+        # Expired leaves grouped by day: a day directory holds every source partition of that day
+        expired = defaultdict(list)
+        for partition, segments in self._partitions().items():
+            if self._is_expired(partition, cutoff):
+                expired[self._day_dir(partition)].extend(segments)
+                continue
+            if len(segments) == 1:
+                continue
+
+            merged = _latest(pq.read_table(segments, schema=self._segment_schema, partitioning=None).to_pandas())
+            merged = merged.sort_values(['published', 'id'], kind='stable')
+            path = os.path.join(partition, f'.seg-{uuid.uuid4().hex}-0.parquet.tmp')
+            pq.write_table(
+                pa.Table.from_pandas(merged, schema=self._segment_schema, preserve_index=False, safe=False),
+                path,
+                compression=SEGMENT_COMPRESSION
+            )
+            # Swapped under the lock readers scan with, so they see either the old segments or the merged one
+            with self._lock:
+                os.replace(path, _final_path(path))
+                for segment in segments:
+                    os.remove(segment)
+
+        # Ids of every expired leaf are collected before any day directory goes
+        expired_ids = [
+            pq.read_table(segments, columns=['id'], partitioning=None).column('id').to_numpy()
+            for segments in expired.values()
+        ]
+        with self._lock:
+            for day_dir in expired:
+                shutil.rmtree(day_dir, ignore_errors=True)
+        self._compact_keys(self._dropped_ids(expired_ids))
+
+    def _dropped_ids(self, expired_ids):
+        """Ids of the expired partitions that no partition still holds"""
+        if not expired_ids:
+            return set()
+        dropped = set(np.concatenate(expired_ids).tolist())
+        remaining = [segment for segments in self._partitions().values() for segment in segments]
+        if remaining and dropped:
+            dropped -= set(pq.read_table(remaining, columns=['id'], partitioning=None).column('id').to_numpy().tolist())
+        return dropped
+
+    def _compact_keys(self, dropped=()):
+        """Fold the per-flush key files into one, leaving out the ``dropped`` ids.
+
+        Dropped articles count as new again if they are ever re-fetched.
+        """
+        files = [os.path.join(self.keys_dir, f) for f in os.listdir(self.keys_dir) if f.endswith('.parquet')]
+        if len(files) <= 1 and not dropped:
+            return
+        keys = pa.concat_tables([pq.read_table(f) for f in files]) if files else None
+        if dropped:
+            with self._state_lock:
+                # Ids appended since they expired are live again
+                dropped = set(dropped) - set(self._pending_keys)
+                if self._keys is not None:
+                    self._keys -= dropped
+            if keys is not None:
+                keys = keys.filter(pc.invert(pc.is_in(keys.column('key'), pa.array(list(dropped), pa.uint64()))))
+        if keys is not None:
+            self._write_keys(keys)
+        for f in files:
+            os.remove(f)
+
+    def compact_in_background(self):
+        """Start a compaction thread unless one is running or there's nothing to do"""
+        if self._compaction is not None and self._compaction.is_alive():
+            return self._compaction
+        if not self.needs_compaction():
+            return None
+        self.flush()
+        self._compaction = threading.Thread(target=self._compact_safely, name='parquet-compaction', daemon=True)
+        self._compaction.start()
+        return self._compaction
+
+    def _compact_safely(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Error compacting {self.root}: {str(e)}")
+
+    def migrate_csv(self, csv_path, transform=None, chunksize=50000):
+        """One-time import of a legacy CSV in chunks; the CSV is renamed once done.
+
+        ``transform`` is applied to each chunk before it is appended, e.g. to
+        score rows that were saved without sentiment.
+        """
+        migrated = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            if transform is not None:
+                chunk = transform(chunk)
+            migrated += len(self.append(chunk))
+            self.flush()
+        os.replace(csv_path, csv_path + '.migrated')
+        return migrated
+
+
+def _latest(df):
+    """Keep the newest version of every article"""
+    return df.sort_values('seq', kind='stable').drop_duplicates(subset='id', keep='last')
+
+
+def _final_path(path):
+    """Published name of a file written under its hidden ``.tmp`` name"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, name[1:-len('.tmp')])
+
+
+def _utc(value):
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts
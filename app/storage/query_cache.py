@@ -0,0 +1,154 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+
+class QueryCache:
+    """In-process LRU cache of query results under a memory budget.
+
+    Entries are keyed on the generation of the data they were read from.
+    ``invalidate`` bumps the generation after every write, so a result read
+    before the write can never be served again. Writes from other processes
+    are picked up by watching the database and WAL files: any change to
+    their size or mtime counts as a new generation too.
+    """
+
+    def __init__(self, db_path, max_bytes):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        stamp = []
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _check_external_writes(self):
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            if self._stamp is not None:
+                self._clear()
+            self._stamp = stamp
+
+    def _clear(self):
+        self.generation += 1
+        self._entries.clear()
+        self._size = 0
+
+    def invalidate(self):
+        """Start a new generation; every cached result is dropped"""
+        with self._lock:
+            self._clear()
+            self._stamp = self._file_stamp()
+
+    def get_or_load(self, key, load):
+        """Return the cached result for ``key``, calling ``load()`` on a miss.
+
+        Callers get their own copy of a frame, so adding or changing columns
+        on it never leaks into the cache. List cells, like ``tickers``, are
+        cached as tuples, so the cells the copies share can't be changed in
+        place either and a hit stays a shallow copy. Other results, like
+        counts, are returned as they are.
+        """
+        if self.max_bytes <= 0:
+            return load()
+        with self._lock:
+            self._check_external_writes()
+            generation = self.generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry[0])
+            self.misses += 1
+
+        result = _freeze(load())
+        size = _sizeof(result)
+        with self._lock:
+            # A write that landed while loading makes this result stale already
+            if generation == self.generation and size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (result, size)
+                self._size += size
+                while self._size > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._size -= evicted
+        return _copy(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def cache_key(name, *args, **kwargs):
+    """Hashable key of a query: method name plus normalized arguments"""
+    return (name,) + tuple(_normalize(v) for v in args) + tuple(
+        (k, _normalize(v)) for k, v in sorted(kwargs.items())
+    )
+
+
+def _sizeof(result):
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    return sys.getsizeof(result)
+
+
+def _copy(result):
+    return result.copy() if isinstance(result, pd.DataFrame) else result
+
+
+def _freeze(result):
+    """Turn the list cells of a frame's object columns into tuples, once, as it is cached"""
+    if not isinstance(result, pd.DataFrame):
+        return result
+    for position, dtype in enumerate(result.dtypes):
+        if dtype == object:
+            values = result.iloc[:, position]
+            if any(isinstance(value, list) for value in values):
+                result.isetitem(position, [tuple(value) if isinstance(value, list) else value for value in values])
+    return result
+
+
+def _normalize(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        # Filters are sets: AAPL,MSFT and MSFT,AAPL are the same query
+        return tuple(sorted({str(v) for v in value})) or None
+    try:
+        return pd.Timestamp(value).isoformat()
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+# One cache per database file, shared by every DatabaseStorage in the process
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_cache(db_path, max_bytes):
+    """The process-wide cache of a database file"""
+    key = os.path.abspath(db_path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = QueryCache(db_path, max_bytes)
+        return cache
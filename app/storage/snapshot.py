@@ -0,0 +1,53 @@
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+
+
+def write_snapshot(df, path):
+    """Publish ``df`` as an uncompressed Arrow IPC file, atomically replacing the old one.
+
+    Uncompressed buffers can be memory-mapped as they are, so every reader
+    process shares the same pages from the OS cache instead of parsing its
+    own copy. Readers holding the previous snapshot keep their mapping.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot_table(path, columns=None):
+    """Memory-map a published snapshot; the returned table's buffers point into the file"""
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def read_snapshot(path, columns=None):
+    """Load a published snapshot as a DataFrame without parsing anything.
+
+    Columns are converted one block each, so numeric and timestamp columns
+    without nulls are views over the mapped file rather than copies.
+    """
+    return snapshot_frame(read_snapshot_table(path, columns))
+
+
+def snapshot_frame(table):
+    """DataFrame of a snapshot table read with read_snapshot_table.
+
+    List columns such as ``tickers`` stay Arrow-backed (``pd.ArrowDtype``)
+    rather than becoming a Python list per row; per-ticker work goes
+    through TickerIndex or ``explode``, and only the rows on screen are
+    ever turned into lists.
+    """
+    return table.to_pandas(split_blocks=True, types_mapper=_arrow_lists)
+
+
+def _arrow_lists(arrow_type):
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
@@ -0,0 +1,82 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteConnectionPool:
+    """A single writer connection behind a lock plus a pool of read-only connections.
+
+    With WAL journaling readers never block the writer and the writer never
+    blocks readers, so ingest and dashboard queries can share one database file.
+    Connections are opened with ``check_same_thread=False`` and handed out to
+    one thread at a time. ``on_connect`` is called with every new connection,
+    e.g. to register SQL functions.
+    """
+
+    def __init__(self, db_path, readers=4, pragmas=None, on_connect=None):
+        self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.on_connect = on_connect
+        self._write_lock = threading.RLock()
+        self._readers = queue.LifoQueue(maxsize=readers)
+        self._reader_slots = threading.Semaphore(readers)
+        self._all_readers = []
+
+        self.writer_conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._apply_pragmas(self.writer_conn)
+        if on_connect is not None:
+            on_connect(self.writer_conn)
+
+    def _apply_pragmas(self, conn, read_only=False):
+        for name, value in self.pragmas.items():
+            # journal_mode and auto_vacuum are properties of the file and are set by the writer
+            if read_only and name in ('journal_mode', 'auto_vacuum'):
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+
+    def _open_reader(self):
+        if self.db_path == ':memory:':
+            # An in-memory database only exists on its own connection
+            return self.writer_conn
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._apply_pragmas(conn, read_only=True)
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        self._all_readers.append(conn)
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """Borrow the writer connection; commit on success, roll back on error"""
+        with self._write_lock:
+            try:
+                yield self.writer_conn
+                self.writer_conn.commit()
+            except Exception:
+                self.writer_conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection, opening one if the pool isn't full yet"""
+        self._reader_slots.acquire()
+        try:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = self._open_reader()
+            try:
+                yield conn
+            finally:
+                self._readers.put(conn)
+        finally:
+            self._reader_slots.release()
+
+    def close(self):
+        """Close every connection"""
+        with self._write_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+            self.writer_conn.close()
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+from config import settings
+from storage.database import DatabaseStorage, PAGE_SORT_COLUMNS
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setitem(settings.DATABASE_CONFIG, 'db_path', str(tmp_path / 'news.db'))
+    db = DatabaseStorage()
+    published = pd.Timestamp.now(tz='UTC').floor('h')
+    db.save_data(pd.DataFrame([
+        {
+            'title': f'Article {i}',
+            'url': f'https://example.com/{i}',
+            'content': f'body {i}',
+            'source': ('Reuters', 'CNBC', 'Yahoo')[i % 3],
+            'source_name': 'test',
+            'type': 'news',
+            # Repeated timestamps and scores, and some missing scores, so ties and NULLs are paged
+            'published': published - pd.Timedelta(hours=i // 4),
+            'tickers': ['AAPL'] if i % 2 else ['MSFT', 'IBM'],
+            'sentiment_score': None if i % 7 == 0 else (i % 5 - 2) / 2
+        }
+        for i in range(53)
+    ]))
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize('sort_by', PAGE_SORT_COLUMNS)
+@pytest.mark.parametrize('descending', [True, False])
+def test_keyset_pages_match_offset_pages(db, sort_by, descending):
+    after, seen = None, []
+    for page in range(6):
+        offset = db.page_data(sort_by=sort_by, descending=descending, page=page, page_size=10)
+        keyset = db.page_data(sort_by=sort_by, descending=descending, page=page, page_size=10, after=after)
+        assert keyset['id'].tolist() == offset['id'].tolist()
+        after = keyset.attrs['cursor']
+        seen.extend(keyset['id'])
+    assert sorted(seen) == sorted(set(seen))
+    assert len(seen) == db.count_data()
+
+
+def test_keyset_pages_keep_filters(db):
+    first = db.page_data(tickers=['AAPL'], page_size=5)
+    second = db.page_data(tickers=['AAPL'], page=1, page_size=5, after=first.attrs['cursor'])
+    assert second['id'].tolist() == db.page_data(tickers=['AAPL'], page=1, page_size=5)['id'].tolist()
+    assert second['tickers'].str.contains('AAPL').all()
+
+
+def test_unknown_sort_column_is_rejected(db):
+    with pytest.raises(ValueError):
+        db.page_data(sort_by='title')
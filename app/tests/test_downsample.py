@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.downsample import downsample, lttb, max_points, minmax
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500) + rng.normal(0, 0.05, len(x))
+    y[4321] = 5.0  # A spike a plot must not lose
+    return x, y
+
+
+def test_lttb_keeps_threshold_points_and_the_ends(series):
+    x, y = series
+    kept = lttb(x, y, 500)
+    assert len(kept) == 500
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert (np.diff(kept) > 0).all()
+    assert 4321 in kept
+
+
+def test_lttb_leaves_small_series_alone(series):
+    x, y = series
+    assert lttb(x[:50], y[:50], 100).tolist() == list(range(50))
+    assert lttb(x[:50], y[:50], 2).tolist() == list(range(50))
+
+
+def test_minmax_keeps_every_bucket_extreme(series):
+    x, y = series
+    kept = minmax(x, y, 100)
+    assert len(kept) <= 200
+    assert (np.diff(kept) > 0).all()
+    assert {int(np.argmax(y)), int(np.argmin(y))} <= set(kept)
+
+
+def test_minmax_leaves_small_series_alone(series):
+    x, y = series
+    assert minmax(x[:150], y[:150], 100).tolist() == list(range(150))
+
+
+def test_downsample_splits_the_budget_between_series(series):
+    x, y = series
+    published = pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(x, unit='min')
+    df = pd.DataFrame({'published': published, 'score': y, 'ticker': np.where(x % 2, 'AAPL', 'MSFT')})
+    result = downsample(df, 'published', 'score', width=300, by='ticker')
+    assert len(result) <= max_points(300)
+    assert set(result['ticker']) == {'AAPL', 'MSFT'}
+    # Kept rows are actual rows of the input
+    pd.testing.assert_frame_equal(result, df.loc[result.index])
+
+
+def test_downsample_zooms_into_x_range(series):
+    x, y = series
+    df = pd.DataFrame({'x': x, 'y': y})
+    result = downsample(df, 'x', 'y', width=100, method='minmax', x_range=(1000, 1100))
+    assert result['x'].between(1000, 1100).all()
+    assert len(result) == 101
+
+
+def test_downsample_rejects_unknown_methods(series):
+    with pytest.raises(ValueError):
+        downsample(pd.DataFrame({'x': [1.0], 'y': [1.0]}), 'x', 'y', method='mean')
@@ -0,0 +1,123 @@
+import os
+import threading
+import pandas as pd
+import pytest
+from storage.file_storage import ParquetStore
+
+
+def articles(n, days_ago=0, sources=('Reuters',), prefix='a'):
+    published = pd.Timestamp.now(tz='UTC').floor('h') - pd.Timedelta(days=days_ago)
+    return pd.DataFrame([
+        {
+            'title': f'{prefix}{i}',
+            'content': f'body {i}',
+            'source': source,
+            'published': published - pd.Timedelta(minutes=i),
+            'url': f'https://example.com/{prefix}/{source}/{i}',
+            'tickers': ['AAPL', 'MSFT'] if i % 2 else ['IBM'],
+            'compound': (i % 5 - 2) / 2
+        }
+        for i in range(n) for source in sources
+    ])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ParquetStore(root=str(tmp_path / 'news'))
+
+
+def segment_files(store):
+    return [path for segments in store._partitions().values() for path in segments]
+
+
+def test_append_returns_only_new_articles(store):
+    assert len(store.append(articles(10))) == 10
+    store.flush()
+    batch = pd.concat([articles(10), articles(5, prefix='b')])
+    assert len(store.append(batch)) == 5
+    store.flush()
+    assert len(store.read()) == 15
+
+
+def test_newest_version_wins(store):
+    store.append(articles(3))
+    store.flush()
+    updated = articles(3).assign(compound=0.9)
+    store.append(updated)
+    store.flush()
+    assert store.read()['compound'].tolist() == [0.9] * 3
+
+
+def test_known_keys_survive_a_restart(store):
+    store.append(articles(4))
+    store.flush()
+    reopened = ParquetStore(root=store.root)
+    assert reopened.append(articles(4)).empty
+
+
+def test_read_filters_tickers_and_sources(store):
+    store.append(articles(6, sources=('Reuters', 'CNBC')))
+    store.flush()
+    assert len(store.read(tickers=['IBM'])) == 6
+    assert set(store.read(sources=['CNBC'])['source']) == {'CNBC'}
+
+
+def test_compaction_merges_segments(store):
+    store.max_segments = 1
+    for prefix in 'abc':
+        store.append(articles(5, prefix=prefix))
+        store.flush()
+    store.append(articles(5, prefix='a').assign(compound=1.0))
+    store.flush()
+    assert store.needs_compaction()
+    store.compact()
+    assert not store.needs_compaction()
+    assert len(segment_files(store)) == 1
+    df = store.read()
+    assert len(df) == 15
+    assert (df[df['title'].str.startswith('a')]['compound'] == 1.0).all()
+
+
+def test_reads_never_see_half_written_segments(store):
+    store.max_segments = 1
+    store.append(articles(200))
+    store.flush()
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                store.read()
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for round_ in range(20):
+        store.append(articles(200, prefix=f'r{round_}-'))
+        store.flush()
+        store.compact()
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
+    assert len(store.read()) == 200 * 21
+
+
+def test_retention_drops_every_source_of_an_expired_day(tmp_path):
+    store = ParquetStore(root=str(tmp_path / 'news'), partition_by=['day', 'source'])
+    old = articles(3, days_ago=60, sources=('Reuters', 'CNBC', 'Yahoo'))
+    store.append(old)
+    store.append(articles(2, prefix='new'))
+    store.flush()
+    assert store.needs_compaction()
+
+    store.compact()
+    expired_days = {f'day={day}' for day in old['published'].dt.strftime('%Y-%m-%d')}
+    assert expired_days.isdisjoint(os.listdir(store.root))
+    assert len(store.read()) == 2
+    # The expired articles count as new again, here and after a restart
+    assert len(store.append(old)) == 9
+    assert len(ParquetStore(root=store.root, partition_by=['day', 'source']).append(old)) == 9
@@ -0,0 +1,73 @@
+import os
+import pandas as pd
+from storage.query_cache import QueryCache, cache_key
+
+
+def frame():
+    return pd.DataFrame({'title': ['a', 'b'], 'tickers': [['AAPL'], ['IBM', 'MSFT']], 'score': [0.1, 0.2]})
+
+
+def test_hits_until_invalidated(tmp_path):
+    cache = QueryCache(str(tmp_path / 'news.db'), max_bytes=10 ** 6)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return frame()
+
+    cache.get_or_load('k', load)
+    cache.get_or_load('k', load)
+    assert len(loads) == 1
+    cache.invalidate()
+    cache.get_or_load('k', load)
+    assert len(loads) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_writes_by_other_processes_invalidate(tmp_path):
+    db_path = tmp_path / 'news.db'
+    db_path.write_bytes(b'v1')
+    cache = QueryCache(str(db_path), max_bytes=10 ** 6)
+    cache.get_or_load('k', frame)
+    db_path.write_bytes(b'version 2')
+    os.utime(db_path, ns=(0, 1))
+    calls = []
+    cache.get_or_load('k', lambda: calls.append(1) or frame())
+    assert calls == [1]
+
+
+def test_result_loaded_across_a_write_is_not_cached(tmp_path):
+    cache = QueryCache(str(tmp_path / 'news.db'), max_bytes=10 ** 6)
+
+    def load():
+        cache.invalidate()
+        return frame()
+
+    cache.get_or_load('k', load)
+    assert cache.stats()['entries'] == 0
+
+
+def test_callers_cannot_change_the_cached_frame(tmp_path):
+    cache = QueryCache(str(tmp_path / 'news.db'), max_bytes=10 ** 6)
+    first = cache.get_or_load('k', frame)
+    first['score'] = 0.0
+    first.loc[0, 'title'] = 'changed'
+    second = cache.get_or_load('k', frame)
+    assert second['score'].tolist() == [0.1, 0.2]
+    assert second['title'].tolist() == ['a', 'b']
+    assert second['tickers'].tolist() == [('AAPL',), ('IBM', 'MSFT')]
+
+
+def test_budget_evicts_least_recently_used(tmp_path):
+    size = int(frame().memory_usage(index=True, deep=True).sum())
+    cache = QueryCache(str(tmp_path / 'news.db'), max_bytes=size * 2)
+    for key in ('a', 'b', 'c'):
+        cache.get_or_load(key, frame)
+    assert cache.stats()['entries'] <= 2
+    calls = []
+    cache.get_or_load('a', lambda: calls.append(1) or frame())
+    assert calls == [1]
+
+
+def test_filters_are_sets():
+    assert cache_key('load', ['MSFT', 'AAPL']) == cache_key('load', ('AAPL', 'MSFT'))
@@ -0,0 +1,33 @@
+import pytest
+from textblob import TextBlob
+from analyzers.sentiment_analyzer import SentimentAnalyzer
+
+TEXTS = [
+    "The company isn't doing well.",
+    "Shares slid after the guidance cut :)",
+    "Great quarter! Revenue beat :( but margins were weak",
+    "Not bad at all :-)",
+    "Analysts don't expect a rebound;\n\nthe outlook is terrible."
+]
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return SentimentAnalyzer(models=['textblob'])
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_textblob_scores_match_textblob(analyzer, text):
+    scores = analyzer.analyze_text(text)
+    expected = TextBlob(text).sentiment
+    assert scores['textblob_polarity'] == pytest.approx(expected.polarity)
+    assert scores['textblob_subjectivity'] == pytest.approx(expected.subjectivity)
+
+
+def test_thresholds_are_strict(analyzer):
+    positive = analyzer.config.SENTIMENT_THRESHOLDS['positive']
+    negative = analyzer.config.SENTIMENT_THRESHOLDS['negative']
+    assert analyzer._classify_sentiment(positive) == 'neutral'
+    assert analyzer._classify_sentiment(negative) == 'neutral'
+    assert analyzer._classify_sentiment(positive + 0.01) == 'positive'
+    assert analyzer._classify_sentiment(negative - 0.01) == 'negative'
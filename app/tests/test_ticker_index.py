@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from processors.ticker_index import TickerIndex
+
+TICKERS = [['AAPL', 'MSFT'], [], ['IBM'], None, ['MSFT', 'MSFT', ''], ['TSLA', 'AAPL']]
+
+
+@pytest.fixture(params=['series', 'arrow'])
+def index(request):
+    if request.param == 'series':
+        return TickerIndex.from_series(pd.Series(TICKERS, dtype=object))
+    return TickerIndex.from_arrow(pa.chunked_array([TICKERS[:3], TICKERS[3:]], pa.list_(pa.string())))
+
+
+def test_mask_matches_membership(index):
+    for wanted in (['AAPL'], ['MSFT', 'IBM'], ['TSLA', 'NOPE'], []):
+        expected = [bool(value) and bool(set(value) & set(wanted)) for value in TICKERS]
+        assert index.mask(wanted).tolist() == expected
+
+
+def test_unknown_tickers_match_nothing(index):
+    assert not index.mask(['NOPE', 'ZZZZ']).any()
+
+
+def test_comma_joined_strings_index_like_lists():
+    joined = TickerIndex.from_series(pd.Series(['AAPL,MSFT', '', 'IBM']))
+    assert joined.mask(['MSFT']).tolist() == [True, False, False]
+    assert joined.tickers.tolist() == ['AAPL', 'IBM', 'MSFT']
+
+
+def test_aggregate_counts_each_article_once(index):
+    scores = [0.5, 0.9, -1.0, 0.3, np.nan, 0.1]
+    result = index.aggregate(scores).set_index('ticker')
+    assert result['count'].to_dict() == {'AAPL': 2, 'IBM': 1, 'MSFT': 2, 'TSLA': 1}
+    assert result.loc['AAPL', 'mean'] == pytest.approx(0.3)
+    # A missing score is counted but left out of the mean
+    assert result.loc['MSFT', 'mean'] == pytest.approx(0.5)
+
+
+def test_aggregate_respects_where(index):
+    result = index.aggregate(np.ones(len(TICKERS)), where=index.mask(['IBM']))
+    assert result['ticker'].tolist() == ['IBM']
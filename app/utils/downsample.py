@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_WIDTH = 1200     # Plot width in pixels when the caller doesn't know better
+POINTS_PER_PIXEL = 2     # More points than this per pixel can't be told apart
+MIN_SERIES_POINTS = 100  # Floor per series when many series share one chart
+
+# Bucket sizes resample_rule picks from, finest first
+RESAMPLE_RULES = ['1min', '5min', '15min', '30min', '1h', '3h', '6h', '12h', '1D', '7D', '30D']
+
+
+def max_points(width=None):
+    """Most points worth sending for a plot ``width`` pixels wide"""
+    return int((width or DEFAULT_WIDTH) * POINTS_PER_PIXEL)
+
+
+def resample_rule(start, end, width=None):
+    """The finest bucket from RESAMPLE_RULES that keeps [start, end] within one bucket per pixel"""
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for rule in RESAMPLE_RULES:
+        if span / pd.Timedelta(rule) <= (width or DEFAULT_WIDTH):
+            return rule
+    return RESAMPLE_RULES[-1]
+
+
+def lttb(x, y, threshold):
+    """Indices of the ``threshold`` points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept. Between them the series is
+    split into equal-count buckets, and from each bucket the point forming
+    the largest triangle with the previously kept point and the mean of the
+    next bucket is chosen, which preserves the visual shape of the line.
+    ``x`` must be sorted.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(x, y, buckets):
+    """Indices of the lowest and highest point in each of ``buckets`` equal-width x ranges.
+
+    Cheaper than LTTB and keeps every spike, at up to two points per bucket.
+    ``x`` must be sorted.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if 2 * buckets >= n or buckets < 1:
+        return np.arange(n)
+
+    span = x[-1] - x[0]
+    bucket = np.zeros(n, dtype=int) if span == 0 else np.minimum(
+        ((x - x[0]) / span * buckets).astype(int), buckets - 1
+    )
+    # Sorted by bucket, then value: each bucket's first entry is its min and its last its max
+    order = np.lexsort((y, bucket))
+    sorted_buckets = bucket[order]
+    firsts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    lasts = np.r_[firsts[1:], n] - 1
+    return np.unique(np.r_[order[firsts], order[lasts]])
+
+
+def downsample(df, x, y, width=None, method='lttb', by=None, x_range=None):
+    """Rows of ``df`` worth plotting as a line of ``y`` over ``x`` in a plot ``width`` pixels wide.
+
+    Only ``x_range`` is considered when given, so zooming in brings back
+    detail. With ``by``, every group is its own series and the point budget
+    is split between them, so the whole chart stays within a fixed payload
+    however much data it covers. The kept rows are actual rows of ``df``,
+    so hover columns stay meaningful.
+    """
+    if method not in ('lttb', 'minmax'):
+        raise ValueError(f"Unknown downsampling method: {method}")
+    df = df.dropna(subset=[x, y])
+    if x_range is not None:
+        start, end = x_range
+        if start is not None:
+            df = df[df[x] >= start]
+        if end is not None:
+            df = df[df[x] <= end]
+
+    groups = [df] if by is None else [group for _, group in df.groupby(by, sort=False)]
+    budget = max(max_points(width) // max(len(groups), 1), MIN_SERIES_POINTS)
+    kept = []
+    for group in groups:
+        group = group.sort_values(x, kind='stable')
+        xs = _numeric(group[x])
+        if method == 'lttb':
+            kept.append(group.iloc[lttb(xs, group[y].to_numpy(), budget)])
+        else:
+            kept.append(group.iloc[minmax(xs, group[y].to_numpy(), budget // 2)])
+    if not kept:
+        return df
+    return pd.concat(kept) if len(kept) > 1 else kept[0]
+
+
+def histogram(values, bins=20, value_range=(-1.0, 1.0)):
+    """Counts per bin midpoint, so a distribution chart ships ``bins`` bars instead of every value"""
+    counts, edges = np.histogram(pd.Series(values).dropna(), bins=bins, range=value_range)
+    return pd.DataFrame({'bin': (edges[:-1] + edges[1:]) / 2, 'count': counts})
+
+
+def _numeric(values):
+    """x values as floats; datetimes become epoch nanoseconds"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float)
+    if values.dtype == object:
+        return pd.to_datetime(values).astype('int64').to_numpy(dtype=float)
+    return values.to_numpy(dtype=float)
@@ -2,10 +2,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from config.settings import Config
+from processors.ticker_index import TickerIndex
+from utils.downsample import resample_rule
 
 class Dashboard:
-    def __init__(self, data):
+    def __init__(self, data, ticker_index=None):
         self.data = data
+        # Pass the index shared with other views of the same data to skip rebuilding it
+        self.ticker_index = ticker_index if ticker_index is not None else TickerIndex.from_series(data['tickers'])
         self.config = Config()
         
     def create_dashboard(self):
@@ -69,18 +73,19 @@ class Dashboard:
         )
     
     def _create_top_stocks_chart(self):
-        top_tickers = self.data.groupby('tickers')['vader_compound'] \
-            .mean().nlargest(10).reset_index()
+        top_tickers = self.ticker_index.aggregate(self.data['vader_compound']).nlargest(10, 'mean')
         return go.Bar(
-            x=top_tickers['vader_compound'],
-            y=top_tickers['tickers'],
+            x=top_tickers['mean'],
+            y=top_tickers['ticker'],
             orientation='h',
             marker_color=self.config.COLORS['positive']
         )
     
-    def _create_timeline(self):
-        timeline_data = self.data.set_index('published')['vader_compound'] \
-            .resample('6H').mean().ffill()
+    def _create_timeline(self, width=None):
+        # Bucket size follows the time span, so the line never has more points than pixels
+        series = self.data.set_index('published')['vader_compound'].sort_index()
+        rule = resample_rule(series.index.min(), series.index.max(), width)
+        timeline_data = series.resample(rule).mean().ffill()
         return go.Scatter(
             x=timeline_data.index,
             y=timeline_data.values,
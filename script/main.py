@@ -1,6 +1,7 @@
+import os
+import sys
 import requests
 import pandas as pd
-from textblob import TextBlob
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import spacy
 from datetime import datetime, timedelta
@@ -11,6 +12,12 @@ from collections import defaultdict
 import typer
 #from analyzers.sentiment_analyzer import SentimentAnalyzer
 #from news_fetchers.alpha_vantage import AlphaVantageFetcher
+
+# The app's snapshot and downsampling modules are shared with the CLI, not copied
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'app'))
+
+from storage.snapshot import write_snapshot, read_snapshot
+from processors.ticker_sentiment import provider_to_compound
 from visualization.dashboard import create_dashboard
 import dash
 
@@ -23,9 +30,21 @@ nltk.download('stopwords')
 stop_words = set(stopwords.words('english'))
 analyzer = SentimentIntensityAnalyzer()
 
+# Sentiment models to run: 'vader', 'textblob' or both (comma-separated)
+SENTIMENT_MODELS = [m.strip() for m in os.getenv('SENTIMENT_MODELS', 'vader').split(',')]
+
+# Arrow snapshot of the processed news, memory-mapped by the dashboard
+SNAPSHOT_FILE = 'financial_news_sentiment.arrow'
+
+
 class FinancialNewsSentimentAnalyzer:
-    def __init__(self, api_keys):
+    def __init__(self, api_keys, models=None):
         self.api_keys = api_keys
+        self.models = models or SENTIMENT_MODELS
+        unknown = set(self.models) - {'vader', 'textblob'}
+        if unknown:
+            raise ValueError(f"Unsupported sentiment models: {sorted(unknown)}")
+        self._textblob_sentiment = None
         self.news_sources = {
             'alpha_vantage': self._fetch_alpha_vantage_news,
             'yahoo_finance': self._fetch_yahoo_finance_news,
@@ -70,6 +89,7 @@ class FinancialNewsSentimentAnalyzer:
                 'source': item.get('source'),
                 'published': item.get('time_published'),
                 'tickers': [t['ticker'] for t in item.get('ticker_sentiment', [])],
+                'ticker_sentiment': item.get('ticker_sentiment', []),
                 'overall_sentiment_score': item.get('overall_sentiment_score'),
                 'overall_sentiment_label': item.get('overall_sentiment_label')
             })
@@ -124,24 +144,38 @@ class FinancialNewsSentimentAnalyzer:
     
     def analyze_sentiment(self, text):
         """
-        Analyze sentiment using multiple approaches
+        Analyze sentiment with the configured models
         """
+        scores = {}
+
         # VADER Sentiment
-        vader_scores = analyzer.polarity_scores(text)
-        
-        # TextBlob Sentiment
-        blob = TextBlob(text)
-        textblob_polarity = blob.sentiment.polarity
-        textblob_subjectivity = blob.sentiment.subjectivity
-        
-        return {
-            'vader_compound': vader_scores['compound'],
-            'vader_positive': vader_scores['pos'],
-            'vader_negative': vader_scores['neg'],
-            'vader_neutral': vader_scores['neu'],
-            'textblob_polarity': textblob_polarity,
-            'textblob_subjectivity': textblob_subjectivity
-        }
+        if 'vader' in self.models:
+            vader_scores = analyzer.polarity_scores(' '.join(text.split()))
+            scores.update({
+                'vader_compound': vader_scores['compound'],
+                'vader_positive': vader_scores['pos'],
+                'vader_negative': vader_scores['neg'],
+                'vader_neutral': vader_scores['neu']
+            })
+
+        # TextBlob Sentiment; pattern tokenizes the raw text as TextBlob(text).sentiment does
+        if 'textblob' in self.models:
+            textblob_polarity, textblob_subjectivity = self._get_textblob_sentiment()(text)
+            scores.update({
+                'textblob_polarity': textblob_polarity,
+                'textblob_subjectivity': textblob_subjectivity
+            })
+
+        return scores
+
+    def _get_textblob_sentiment(self):
+        """
+        Load TextBlob/pattern on first use only
+        """
+        if self._textblob_sentiment is None:
+            from textblob.en import sentiment
+            self._textblob_sentiment = sentiment
+        return self._textblob_sentiment
     
     def process_news(self, news_df):
         """
@@ -149,15 +183,27 @@ class FinancialNewsSentimentAnalyzer:
         """
         if news_df.empty:
             return news_df
-            
+        news_df = news_df.reset_index(drop=True)
+        
+        # Articles the provider already scored aren't scored again locally
+        if 'overall_sentiment_score' in news_df.columns:
+            provider_score = pd.to_numeric(news_df['overall_sentiment_score'], errors='coerce')
+        else:
+            provider_score = pd.Series(float('nan'), index=news_df.index)
+        needs_scoring = provider_score.isna() & news_df['summary'].notna()
+        
         # Apply sentiment analysis
-        news_df['sentiment'] = news_df['summary'].apply(
-            lambda x: self.analyze_sentiment(str(x)) if pd.notnull(x) else None
-        )
+        sentiment_cols = pd.DataFrame([
+            self.analyze_sentiment(str(text)) if score else {}
+            for text, score in zip(news_df['summary'], needs_scoring)
+        ], index=news_df.index)
+        news_df = pd.concat([news_df, sentiment_cols], axis=1)
         
-        # Expand sentiment columns
-        sentiment_cols = pd.json_normalize(news_df['sentiment'])
-        news_df = pd.concat([news_df.drop('sentiment', axis=1), sentiment_cols], axis=1)
+        # One score per article on the compound scale: the local model's, or the provider's rescaled
+        local_col = 'vader_compound' if 'vader_compound' in news_df.columns else 'textblob_polarity'
+        local_score = news_df[local_col] if local_col in news_df.columns else pd.Series(float('nan'), index=news_df.index)
+        news_df['sentiment_score'] = local_score.fillna(provider_to_compound(provider_score))
+        news_df['score_origin'] = provider_score.notna().map({True: 'provider', False: 'local'})
         
         return news_df
     
@@ -171,17 +217,32 @@ class FinancialNewsSentimentAnalyzer:
         # Explode the tickers column to have one row per ticker
         exploded_df = news_df.explode('tickers')
         
+        # Prefer the provider's ticker-specific sentiment over the article-wide score
+        if 'ticker_sentiment' in exploded_df.columns:
+            provider = exploded_df.apply(
+                lambda row: next(
+                    (item for item in row['ticker_sentiment'] if item.get('ticker') == row['tickers']), {}
+                ) if isinstance(row['ticker_sentiment'], list) else {},
+                axis=1
+            )
+            exploded_df['relevance_score'] = pd.to_numeric(provider.str.get('relevance_score'), errors='coerce')
+            exploded_df['ticker_sentiment_score'] = pd.to_numeric(
+                provider.str.get('ticker_sentiment_score'), errors='coerce')
+            # On the compound scale, like sentiment_score, which stands in where the provider has none
+            exploded_df['ticker_score'] = provider_to_compound(exploded_df['ticker_sentiment_score'])
+            if 'sentiment_score' in exploded_df.columns:
+                exploded_df['ticker_score'] = exploded_df['ticker_score'].fillna(exploded_df['sentiment_score'])
+        
         # Group by ticker and calculate mean sentiment
+        score_columns = ['sentiment_score', 'vader_compound', 'vader_positive', 'vader_negative',
+                         'textblob_polarity', 'ticker_sentiment_score', 'ticker_score', 'relevance_score']
         aggregated = exploded_df.groupby('tickers').agg({
-            'vader_compound': 'mean',
-            'vader_positive': 'mean',
-            'vader_negative': 'mean',
-            'textblob_polarity': 'mean'
+            col: 'mean' for col in score_columns if col in exploded_df.columns
         }).reset_index()
         
         return aggregated
     
-    def visualize_sentiment(self, aggregated_df, metric='vader_compound'):
+    def visualize_sentiment(self, aggregated_df, metric='sentiment_score'):
         """
         Visualize sentiment by ticker
         """
@@ -234,7 +295,8 @@ def main() :
         
         # Save results
         processed_news.to_csv('financial_news_sentiment.csv', index=False)
-        print("\nResults saved to financial_news_sentiment.csv")
+        write_snapshot(processed_news, SNAPSHOT_FILE)
+        print(f"\nResults saved to financial_news_sentiment.csv and {SNAPSHOT_FILE}")
     else:
         print("No news articles fetched")
 
@@ -244,11 +306,12 @@ def main() :
     # Fetch and process news
     news_df = fetcher.fetch_news(tech_tickers, days_back=7)
     processed_news = analyzer.process_news(news_df)
-    aggregated = analyzer.aggregate_sentiment_by_ticker(processed_news)
     
-    # Create and run dashboard
-    app = create_dashboard(processed_news, aggregated)
-    app.run_server(debug=True, port=8050)
+    # Create and run dashboard from the memory-mapped snapshot; it aggregates per filter itself
+    write_snapshot(processed_news, SNAPSHOT_FILE)
+    # The snapshot's mtime versions the cached figures
+    app = create_dashboard(read_snapshot(SNAPSHOT_FILE), version=os.stat(SNAPSHOT_FILE).st_mtime_ns)
+    app.run(debug=True, port=8050)
 
 def run():
     app()
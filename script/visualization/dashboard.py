@@ -1,67 +1,331 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 import dash
-from dash import dcc, html
+from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from functools import lru_cache
+from utils.downsample import downsample, histogram, resample_rule
 
-def create_dashboard(processed_news, aggregated_sentiment):
-    """Create an interactive Dash dashboard"""
-    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
+FILTER_CACHE_SIZE = 128  # Filter combinations kept warm per figure
+FIGURE_CACHE_BYTES = 256 * 1024 * 1024  # Serialized figures kept across all data versions
+WEBGL_POINTS = 10000  # Above this many points SVG stalls the browser; scatter traces switch to WebGL
+WIDTH_STEP = 100  # Measured plot widths are rounded to this, so nearby sizes share cached figures
+
+# Filters each figure depends on; a figure only updates when one of its own filters changes.
+# The source mix ignores the source filter and the ticker ranking ignores the ticker filter.
+FIGURE_FILTERS = {
+    'gauge': ('tickers', 'dates', 'sources'),
+    'distribution': ('tickers', 'dates', 'sources'),
+    'timeseries': ('tickers', 'dates', 'sources'),
+    'bubble': ('tickers', 'dates', 'sources'),
+    'top-tickers': ('dates', 'sources'),
+    'sources': ('tickers', 'dates'),
+    'heatmap': ('tickers', 'dates', 'sources')
+}
+
+FILTER_INPUTS = {
+    'tickers': [Input('ticker-filter', 'value')],
+    'dates': [Input('date-filter', 'start_date'), Input('date-filter', 'end_date')],
+    'sources': [Input('source-filter', 'value')]
+}
+
+# Figures drawn for the visible x range and plot width, tracked in a '<name>-view' store
+VIEW_FIGURES = ('timeseries',)
+
+# Folds a graph's relayoutData into its view store: the zoomed x range (null when
+# autoranged or when a filter changed) and the graph's width in pixels
+UPDATE_VIEW = """
+function(relayout, tickers, startDate, endDate, sources, previous, graphId) {
+    var view = Object.assign({range: null, width: null}, previous);
+    var graph = document.getElementById(graphId);
+    if (graph) {
+        view.width = graph.offsetWidth;
+    }
+    var triggered = dash_clientside.callback_context.triggered.map(function(t) { return t.prop_id; });
+    if (!triggered.some(function(id) { return id.endsWith('.relayoutData'); })) {
+        view.range = null;
+    } else if (relayout && relayout['xaxis.autorange']) {
+        view.range = null;
+    } else if (relayout && 'xaxis.range[0]' in relayout) {
+        view.range = [relayout['xaxis.range[0]'], relayout['xaxis.range[1]']];
+    } else if (relayout && relayout['xaxis.range']) {
+        view.range = relayout['xaxis.range'];
+    }
+    // An unchanged view must not redraw the figure, or every redraw would trigger another
+    return JSON.stringify(view) === JSON.stringify(previous) ? dash_clientside.no_update : view;
+}
+"""
+
+def create_dashboard(processed_news, version=None):
+    """Create an interactive Dash dashboard filtered by ticker, date range and source.
     
-    # Pre-process data for visualizations
-    time_series_df = create_time_series_data(processed_news)
-    top_tickers = aggregated_sentiment.nlargest(10, 'vader_compound')
+    ``version`` identifies the data, e.g. the snapshot file's mtime; figures
+    cached for the same version are served without rebuilding them.
+    """
+    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
+    data = DashboardData(processed_news, version=version)
     
     app.layout = dbc.Container([
         dbc.Row(dbc.Col(html.H1("Financial News Sentiment Dashboard", className="text-center my-4"))),
         
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(id='ticker-filter', options=data.tickers, multi=True,
+                                 placeholder='All tickers'), md=5),
+            dbc.Col(dcc.DatePickerRange(id='date-filter', min_date_allowed=data.first_day,
+                                        max_date_allowed=data.last_day, start_date=data.first_day,
+                                        end_date=data.last_day), md=3),
+            dbc.Col(dcc.Dropdown(id='source-filter', options=data.sources, multi=True,
+                                 placeholder='All sources'), md=4)
+        ], className="mb-4"),
+        
         dbc.Row([
             dbc.Col([
-                dcc.Graph(figure=create_sentiment_gauge(aggregated_sentiment)),
-                dcc.Graph(figure=create_sentiment_distribution(processed_news))
+                dcc.Graph(id='gauge-graph'),
+                dcc.Graph(id='distribution-graph')
             ], md=4),
             
             dbc.Col([
-                dcc.Graph(figure=create_sentiment_timeseries(time_series_df)),
-                dcc.Graph(figure=create_sentiment_bubble(processed_news))
+                dcc.Graph(id='timeseries-graph'),
+                dcc.Graph(id='bubble-graph')
             ], md=8)
         ]),
         
         dbc.Row([
-            dbc.Col(dcc.Graph(figure=create_ticker_barchart(top_tickers)), md=6),
-            dbc.Col(dcc.Graph(figure=create_source_piechart(processed_news)), md=6)
+            dbc.Col(dcc.Graph(id='top-tickers-graph'), md=6),
+            dbc.Col(dcc.Graph(id='sources-graph'), md=6)
         ]),
         
         dbc.Row([
-            dbc.Col(dcc.Graph(figure=create_heatmap(processed_news)), width=12)
+            dbc.Col(dcc.Graph(id='heatmap-graph'), width=12)
         ]),
         
+        *[dcc.Store(id=f'{name}-view') for name in VIEW_FIGURES],
         html.Div(id='hover-data', style={'display': 'none'})
     ], fluid=True)
     
+    for name in VIEW_FIGURES:
+        app.clientside_callback(
+            UPDATE_VIEW,
+            Output(f'{name}-view', 'data'),
+            Input(f'{name}-graph', 'relayoutData'),
+            *[component for f in FIGURE_FILTERS[name] for component in FILTER_INPUTS[f]],
+            State(f'{name}-view', 'data'),
+            State(f'{name}-graph', 'id')
+        )
+    for name, filters in FIGURE_FILTERS.items():
+        _register_figure_callback(app, data, name, filters)
+    
     return app
 
-def create_sentiment_timeseries(df):
-    """Create interactive time series chart"""
-    fig = px.line(df, x='date', y='vader_compound', 
+def _register_figure_callback(app, data, name, filters):
+    """Redraw one figure from the shared cache whenever one of its filters, or its view, changes"""
+    inputs = [component for f in filters for component in FILTER_INPUTS[f]]
+    if name in VIEW_FIGURES:
+        inputs.append(Input(f'{name}-view', 'data'))
+    
+    @app.callback(Output(f'{name}-graph', 'figure'), inputs)
+    def update_figure(*values):
+        state = dict(zip([i.component_id + '.' + i.component_property for i in inputs], values))
+        key = filter_key(
+            tickers=state.get('ticker-filter.value'),
+            start_date=state.get('date-filter.start_date'),
+            end_date=state.get('date-filter.end_date'),
+            sources=state.get('source-filter.value')
+        )
+        return data.figure(name, key, plot_view(state.get(f'{name}-view.data')))
+
+def filter_key(tickers=None, start_date=None, end_date=None, sources=None):
+    """Hashable filter state; empty selections mean everything"""
+    return (
+        tuple(sorted(tickers)) if tickers else None,
+        str(start_date)[:10] if start_date else None,
+        str(end_date)[:10] if end_date else None,
+        tuple(sorted(sources)) if sources else None
+    )
+
+def plot_view(view=None):
+    """Hashable (x_range, width) of a view store; None parts mean the full range and default width"""
+    view = view or {}
+    x_range = tuple(str(value) for value in view['range']) if view.get('range') else None
+    width = max(int(round(view['width'] / WIDTH_STEP)) * WIDTH_STEP, WIDTH_STEP) if view.get('width') else None
+    return x_range, width
+
+def filter_hash(key):
+    """Stable digest of a filter_key, the same in every process"""
+    return hashlib.md5(json.dumps(key, default=str).encode('utf-8')).hexdigest()
+
+def render_mode(points):
+    """'webgl' for traces with more than WEBGL_POINTS points, 'svg' otherwise"""
+    return 'webgl' if points > WEBGL_POINTS else 'svg'
+
+class FigureCache:
+    """LRU cache of figures serialized to JSON, bounded by their total size.
+    
+    Keyed on (data version, figure, filter hash), so a figure is built and
+    encoded once per version and filter state. Dashboards over the same
+    data share entries, and entries of older versions age out.
+    """
+    
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get_or_build(self, key, build):
+        """Return the cached JSON for ``key``, calling ``build()`` for a figure on a miss"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                return payload
+        payload = build().to_json()
+        with self._lock:
+            if len(payload) <= self.max_bytes and key not in self._entries:
+                self._entries[key] = payload
+                self._size += len(payload)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return payload
+
+# Shared by every dashboard in the process
+figure_cache = FigureCache()
+
+class DashboardData:
+    """Memoized aggregates and figures of the processed news, keyed on filter state.
+    
+    All callbacks of all clients share one instance, so each filter
+    combination is computed once and served warm from then on. Filtered
+    rows and daily rollups are cached for every figure to build on, and
+    figures are cached as JSON in ``figure_cache`` under the data version.
+    """
+    
+    def __init__(self, news, cache_size=FILTER_CACHE_SIZE, version=None, cache=None):
+        news = news.copy()
+        if 'ticker' not in news.columns and 'tickers' in news.columns:
+            # One row per (article, ticker), as the per-ticker charts expect
+            news = news.explode('tickers').rename(columns={'tickers': 'ticker'})
+        news['published'] = pd.to_datetime(news['published'], errors='coerce')
+        news = news.dropna(subset=['published'])
+        news['day'] = news['published'].dt.date
+        self.news = news.reset_index(drop=True)
+        self.tickers = sorted(self.news['ticker'].dropna().unique())
+        self.sources = sorted(self.news['source'].dropna().unique())
+        self.first_day = self.news['day'].min() if not self.news.empty else None
+        self.last_day = self.news['day'].max() if not self.news.empty else None
+        self.version = version if version is not None else self._fingerprint()
+        self.cache = cache if cache is not None else figure_cache
+        # Bound per instance so the caches go away with the data
+        self.filtered = lru_cache(maxsize=cache_size)(self._filtered)
+        self.time_series = lru_cache(maxsize=cache_size)(self._time_series)
+    
+    def _fingerprint(self):
+        """Content hash of the news, for when the caller has no version to give"""
+        hashed = pd.util.hash_pandas_object(self.news.astype(str), index=False)
+        return hashlib.md5(hashed.to_numpy().tobytes()).hexdigest()
+    
+    def figure_json(self, name, key, view=(None, None)):
+        """One figure for one filter state and plot view, serialized"""
+        return self.cache.get_or_build(
+            (self.version, name, filter_hash(key), view), lambda: self._figure(name, key, view)
+        )
+    
+    def figure(self, name, key, view=(None, None)):
+        """One figure for one filter state and plot view, as the dict Dash sends to the browser"""
+        # Decoding the cached JSON is far cheaper than building and encoding the figure again
+        return json.loads(self.figure_json(name, key, view))
+    
+    def _filtered(self, key):
+        tickers, start_day, end_day, sources = key
+        news = self.news
+        mask = pd.Series(True, index=news.index)
+        if tickers:
+            mask &= news['ticker'].isin(tickers)
+        if start_day:
+            mask &= news['day'] >= pd.Timestamp(start_day).date()
+        if end_day:
+            mask &= news['day'] <= pd.Timestamp(end_day).date()
+        if sources:
+            mask &= news['source'].isin(sources)
+        return news[mask]
+    
+    def _time_series(self, key):
+        return create_time_series_data(self.filtered(key))
+    
+    def _visible_series(self, key, view):
+        """Per-ticker series of the visible x range, bucketed and downsampled for the plot width"""
+        x_range, width = view
+        news = self.filtered(key)
+        if x_range is not None:
+            start, end = (_like(news['published'], value) for value in x_range)
+            news = news[(news['published'] >= start) & (news['published'] <= end)]
+        return create_visible_series(news, width, x_range)
+    
+    def _figure(self, name, key, view=(None, None)):
+        news = self.filtered(key)
+        if news.empty:
+            return empty_figure("No articles match the filters")
+        if name == 'gauge':
+            fig = create_sentiment_gauge(news.groupby('ticker', as_index=False)['sentiment_score'].mean())
+        elif name == 'distribution':
+            fig = create_sentiment_distribution(news)
+        elif name == 'timeseries':
+            fig = create_sentiment_timeseries(self._visible_series(key, view), uirevision=filter_hash(key))
+        elif name == 'bubble':
+            if 'textblob_subjectivity' not in news.columns:
+                return empty_figure("Subjectivity needs the textblob sentiment model")
+            fig = create_sentiment_bubble(news)
+        elif name == 'top-tickers':
+            fig = create_ticker_barchart(
+                news.groupby('ticker', as_index=False)['sentiment_score'].mean().nlargest(10, 'sentiment_score')
+            )
+        elif name == 'sources':
+            fig = create_source_piechart(news)
+        elif name == 'heatmap':
+            fig = create_heatmap(self.time_series(key))
+        else:
+            raise ValueError(f"Unknown figure: {name}")
+        return fig
+
+def empty_figure(message):
+    """Placeholder figure carrying just a message"""
+    fig = go.Figure()
+    fig.update_layout(template='plotly_dark', height=300, xaxis_visible=False, yaxis_visible=False,
+                      annotations=[dict(text=message, showarrow=False, font=dict(size=16))])
+    return fig
+
+def create_sentiment_timeseries(df, uirevision=None):
+    """Create interactive time series chart from create_visible_series rows.
+    
+    ``uirevision`` keeps the user's zoom while the figure is redrawn for it.
+    """
+    fig = px.line(df, x='date', y='sentiment_score', 
                  color='ticker', title='Sentiment Over Time',
                  template='plotly_dark',
-                 hover_data=['title', 'source'])
+                 hover_data=['title', 'source'],
+                 render_mode=render_mode(len(df)))
     
     fig.update_layout(
         xaxis_title='Date',
         yaxis_title='Sentiment Score',
         hovermode='x unified',
-        height=400
+        height=400,
+        uirevision=uirevision
     )
     return fig
 
 def create_ticker_barchart(df):
     """Create horizontal bar chart for top tickers"""
-    fig = px.bar(df, x='vader_compound', y='ticker', 
+    fig = px.bar(df, x='sentiment_score', y='ticker', 
                 orientation='h', title='Top Positive Sentiment Stocks',
-                color='vader_compound',
+                color='sentiment_score',
                 color_continuous_scale='RdYlGn',
                 template='plotly_dark')
     
@@ -74,7 +338,7 @@ def create_ticker_barchart(df):
 
 def create_sentiment_gauge(df):
     """Create gauge meter for overall sentiment"""
-    avg_sentiment = df['vader_compound'].mean()
+    avg_sentiment = df['sentiment_score'].mean()
     
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
@@ -100,12 +364,26 @@ def create_sentiment_gauge(df):
     fig.update_layout(height=250, margin=dict(t=50, b=10))
     return fig
 
+def create_sentiment_distribution(df):
+    """Create histogram of article sentiment, binned here rather than in the browser"""
+    fig = px.bar(histogram(df['sentiment_score'], bins=20), x='bin', y='count',
+                title='Sentiment Distribution', template='plotly_dark',
+                labels={'bin': 'Sentiment Score', 'count': 'Articles'})
+    
+    fig.update_layout(bargap=0, height=300)
+    return fig
+
 def create_sentiment_bubble(df):
-    """Create bubble chart of sentiment vs subjectivity"""
-    fig = px.scatter(df, x='vader_compound', y='textblob_subjectivity',
-                    size='vader_positive', color='ticker',
+    """Create bubble chart of sentiment vs subjectivity, drawn with WebGL when large"""
+    # Subjectivity and VADER's positive share only exist for locally scored articles;
+    # without the vader model every bubble gets the same size
+    size = 'vader_positive' if 'vader_positive' in df.columns else None
+    df = df.dropna(subset=['textblob_subjectivity'] + ([size] if size else []))
+    fig = px.scatter(df, x='sentiment_score', y='textblob_subjectivity',
+                    size=size, color='ticker',
                     hover_name='title', title='Sentiment vs Subjectivity',
-                    template='plotly_dark')
+                    template='plotly_dark',
+                    render_mode=render_mode(len(df)))
     
     fig.update_layout(
         xaxis_range=[-1,1],
@@ -127,10 +405,9 @@ def create_source_piechart(df):
     fig.update_layout(height=400)
     return fig
 
-def create_heatmap(df):
-    """Create heatmap of sentiment by ticker and time"""
-    pivot_df = df.pivot_table(index='date', columns='ticker', 
-                            values='vader_compound', aggfunc='mean')
+def create_heatmap(daily_df):
+    """Create heatmap of sentiment by ticker and time from the daily rollup"""
+    pivot_df = daily_df.pivot(index='date', columns='ticker', values='sentiment_score')
     
     fig = px.imshow(pivot_df.T,
                    color_continuous_scale='RdYlGn',
@@ -141,10 +418,33 @@ def create_heatmap(df):
     return fig
 
 def create_time_series_data(df):
-    """Prepare time series data"""
-    df['date'] = pd.to_datetime(df['published']).dt.date
+    """Roll articles up to one row per (date, ticker), shared by the time series and heatmap"""
+    df = df.assign(date=pd.to_datetime(df['published']).dt.date)
     return df.groupby(['date', 'ticker']).agg({
-        'vader_compound': 'mean',
+        'sentiment_score': 'mean',
         'title': 'count',
         'source': 'first'
-    }).reset_index()
\ No newline at end of file
+    }).reset_index()
+
+def create_visible_series(df, width=None, x_range=None):
+    """Roll articles up per ticker into the finest buckets the plot width can show, then
+    downsample each series to the width's point budget"""
+    if df.empty:
+        return df.assign(date=df['published'])[['date', 'ticker', 'sentiment_score', 'title', 'source']]
+    start, end = x_range if x_range is not None else (df['published'].min(), df['published'].max())
+    rule = resample_rule(start, end, width)
+    df = df.assign(date=df['published'].dt.floor(rule))
+    series = df.groupby(['date', 'ticker']).agg({
+        'sentiment_score': 'mean',
+        'title': 'count',
+        'source': 'first'
+    }).reset_index()
+    return downsample(series, 'date', 'sentiment_score', width=width, by='ticker')
+
+def _like(published, value):
+    """A relayoutData x value as a timestamp comparable with ``published``"""
+    ts = pd.Timestamp(value)
+    tz = getattr(published.dt, 'tz', None)
+    if tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(tz)
+    return ts